@@ -0,0 +1,3 @@
+"""
+Benchmarks - Synthetic Corpora and Performance Measurements for the Pipeline
+"""
@@ -0,0 +1,105 @@
+"""
+ANN Benchmark - IVF Index Recall and Latency against Brute-Force Cosine
+
+Usage: python benchmarks/ann.py [--vectors 300000] [--dimension 96] [--probes 1 4 8 16 32] [--json report.json]
+"""
+
+import sys
+import json
+import time
+import argparse
+import tempfile
+import numpy as np
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from ann_index import IVFIndex
+from top_k import top_k_indices
+
+def clustered_vectors(count: int, dimension: int, clusters: int = 2000, seed: int = 0) -> np.ndarray:
+    """Embedding-like vectors scattered around random topic centres"""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dimension)).astype(np.float32)
+    noise = rng.normal(scale=0.6, size=(count, dimension)).astype(np.float32)
+    return centres[rng.integers(0, clusters, count)] + noise
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the IVF index against brute force")
+    parser.add_argument("--vectors", type=int, default=300000, help="number of section embeddings")
+    parser.add_argument("--dimension", type=int, default=96, help="embedding width (96 = spaCy tok2vec)")
+    parser.add_argument("--queries", type=int, default=100, help="number of queries timed and checked")
+    parser.add_argument("--k", type=int, default=10, help="neighbours per query for recall@k")
+    parser.add_argument("--probes", type=int, nargs="+", default=[1, 4, 8, 16, 32], help="probe counts to try")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+    
+    vectors = clustered_vectors(args.vectors, args.dimension)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.integers(0, len(vectors), args.queries)]
+    queries = queries + rng.normal(scale=0.3, size=queries.shape).astype(np.float32)
+    
+    # Build on 90% of the vectors, then add the rest incrementally
+    split = int(len(vectors) * 0.9)
+    start = time.perf_counter()
+    index = IVFIndex.build(vectors[:split])
+    build_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    index.add(vectors[split:])
+    add_seconds = time.perf_counter() - start
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = str(Path(tmp_dir) / "index.npz")
+        start = time.perf_counter()
+        index.save(path)
+        save_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        index = IVFIndex.load(path)
+        load_seconds = time.perf_counter() - start
+    
+    # Brute force as the scorer would run it without an index
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    start = time.perf_counter()
+    for query in queries:
+        top_k_indices(normalized @ (query / np.linalg.norm(query)), args.k)
+    brute_force_ms = (time.perf_counter() - start) / len(queries) * 1000
+    
+    results = []
+    for n_probe in args.probes:
+        start = time.perf_counter()
+        for query in queries:
+            index.search(query, args.k, n_probe)
+        search_ms = (time.perf_counter() - start) / len(queries) * 1000
+        results.append({
+            'n_probe': n_probe,
+            'search_ms': search_ms,
+            'speedup': brute_force_ms / search_ms,
+            f'recall_at_{args.k}': index.recall_at_k(queries, args.k, n_probe)
+        })
+    
+    print(f"{len(index)} vectors x {args.dimension} in {index.n_lists} lists: build {build_seconds:.2f}s, "
+          f"add 10% {add_seconds:.2f}s, save {save_seconds:.2f}s, load {load_seconds:.2f}s")
+    print(f"brute force: {brute_force_ms:.2f} ms/query")
+    print(f"{'probes':>6} {'ms/query':>9} {'speedup':>8} {f'recall@{args.k}':>10}")
+    for r in results:
+        print(f"{r['n_probe']:>6} {r['search_ms']:>9.2f} {r['speedup']:>7.1f}x {r[f'recall_at_{args.k}']:>10.3f}")
+    
+    if args.json:
+        report = {
+            'vectors': len(index),
+            'dimension': args.dimension,
+            'n_lists': index.n_lists,
+            'k': args.k,
+            'build_seconds': build_seconds,
+            'add_seconds': add_seconds,
+            'save_seconds': save_seconds,
+            'load_seconds': load_seconds,
+            'brute_force_ms': brute_force_ms,
+            'results': results
+        }
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Embedder Benchmark - spaCy tok2vec vs. MiniLM on onnxruntime
+
+Usage: python benchmarks/embedders.py [--texts 2000] [--threads 4] [--json report.json]
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+import numpy as np
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from model_loader import OfflineModelLoader, LightweightEmbedder
+from onnx_embedder import OnnxMiniLMEmbedder
+
+WORDS = (
+    "travel plan itinerary group friends college budget hotel hostel beach museum restaurant "
+    "nightlife train bus metro ticket booking reservation day trip tour guide coast city old town "
+    "market wine tasting cooking class festival evening morning afternoon visit explore walk "
+    "price cost address hours directions accommodation local cuisine seafood history culture"
+).split()
+
+def synthetic_sections(count: int, seed: int = 0):
+    """Section-like texts between roughly 40 and 800 characters"""
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        sentences = []
+        for _ in range(rng.randint(1, 10)):
+            sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 14)))
+            sentences.append(sentence.capitalize() + ".")
+        texts.append(" ".join(sentences)[:800])
+    return texts
+
+def benchmark(name, create, texts, latency_samples: int = 50):
+    """Load time, batch throughput and single-text latency of one embedder"""
+    start = time.perf_counter()
+    embedder = create()
+    load_seconds = time.perf_counter() - start
+    
+    embedder.encode_batch(texts[:32])  # Warm up
+    
+    start = time.perf_counter()
+    matrix = embedder.encode_batch(texts)
+    batch_seconds = time.perf_counter() - start
+    
+    latencies = []
+    for text in texts[:latency_samples]:
+        start = time.perf_counter()
+        embedder.encode(text)
+        latencies.append((time.perf_counter() - start) * 1000)
+    
+    return {
+        'embedder': name,
+        'dimension': int(matrix.shape[1]),
+        'load_seconds': load_seconds,
+        'texts_per_second': len(texts) / batch_seconds,
+        'single_text_ms_p50': float(np.percentile(latencies, 50)),
+        'single_text_ms_p95': float(np.percentile(latencies, 95))
+    }, matrix
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the section embedders")
+    parser.add_argument("--texts", type=int, default=2000, help="number of synthetic sections")
+    parser.add_argument("--threads", type=int, default=None, help="onnxruntime intra-op threads")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+    
+    loader = OfflineModelLoader()
+    snapshot = loader.minilm_snapshot_dir()
+    texts = synthetic_sections(args.texts)
+    
+    # Caches stay off so every text is really embedded
+    candidates = [
+        ("spacy-tok2vec", lambda: LightweightEmbedder(loader.load_spacy_pipeline("embed"))),
+        ("minilm-onnx-fp32", lambda: OnnxMiniLMEmbedder(snapshot, args.threads, quantize=False)),
+        ("minilm-onnx-int8", lambda: OnnxMiniLMEmbedder(snapshot, args.threads, quantize=True)),
+    ]
+    
+    results = []
+    matrices = {}
+    for name, create in candidates:
+        result, matrices[name] = benchmark(name, create, texts)
+        results.append(result)
+    
+    # How far int8 quantization moves the float32 embeddings
+    agreement = np.sum(matrices["minilm-onnx-fp32"] * matrices["minilm-onnx-int8"], axis=1)
+    
+    print(f"{'embedder':<18} {'dim':>4} {'load s':>7} {'texts/s':>9} {'p50 ms':>7} {'p95 ms':>7}")
+    for r in results:
+        print(f"{r['embedder']:<18} {r['dimension']:>4} {r['load_seconds']:>7.2f} "
+              f"{r['texts_per_second']:>9.1f} {r['single_text_ms_p50']:>7.2f} {r['single_text_ms_p95']:>7.2f}")
+    print(f"int8 vs fp32 cosine: mean {agreement.mean():.4f}, min {agreement.min():.4f}")
+    
+    if args.json:
+        report = {
+            'texts': args.texts,
+            'threads': args.threads,
+            'results': results,
+            'int8_fp32_cosine_mean': float(agreement.mean()),
+            'int8_fp32_cosine_min': float(agreement.min())
+        }
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
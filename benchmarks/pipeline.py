@@ -0,0 +1,172 @@
+"""
+Pipeline Benchmark - End-to-End Scaling over Synthetic Corpora
+
+Runs PDFProcessor -> RelevanceScorer -> SubsectionExtractor -> OutputFormatter
+over synthetic corpora of increasing size, each in a fresh process so peak
+RSS and model loads are measured per corpus.
+
+Usage: python -m benchmarks.pipeline [--sizes 5,20,50] [--pages 8] [--workers 4] [--report report.json]
+"""
+
+import os
+import sys
+import json
+import time
+import resource
+import tempfile
+import platform
+import argparse
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+
+from benchmarks.synthetic_corpus import CorpusSpec, generate_corpus, write_challenge_config
+
+def _peak_rss_mb(who) -> float:
+    """Peak resident set size in MB (ru_maxrss is KB on Linux)"""
+    return resource.getrusage(who).ru_maxrss / 1024
+
+def run_pipeline(pdf_paths: List[str], config: Dict[str, Any], workers: int,
+                 output_path: str) -> Dict[str, Any]:
+    """Run every pipeline stage once and time each of them"""
+    from model_loader import OfflineModelLoader
+    from pdf_processor import PDFProcessor
+    from semantic_analyzer import SemanticAnalyzer
+    from relevance_scorer import RelevanceScorer
+    from subsection_extractor import SubsectionExtractor
+    from output_formatter import OutputFormatter
+    
+    persona = config["persona"]["role"]
+    job_description = config["job_to_be_done"]["task"]
+    stages = {}
+    
+    start = time.perf_counter()
+    model_loader = OfflineModelLoader(str(PROJECT_ROOT))
+    semantic_analyzer = SemanticAnalyzer(
+        model_loader.load_spacy_pipeline("sentences"),
+        model_loader.create_lightweight_embedder(),
+        model_loader.load_domain_vocabularies()
+    )
+    stages['load_models'] = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    document_sections = PDFProcessor().extract_documents(pdf_paths, workers)
+    sections = [section for document in document_sections for section in document]
+    stages['extract'] = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    relevance_scorer = RelevanceScorer(semantic_analyzer)
+    scored_sections = relevance_scorer.score_all_sections(sections, persona, job_description, top_k=7)
+    top_sections = relevance_scorer.get_top_sections_for_target_output(scored_sections, top_k=7)
+    stages['score'] = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    refined_subsections = SubsectionExtractor(semantic_analyzer).extract_refined_subsections(
+        top_sections, persona, job_description
+    )
+    stages['subsections'] = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    output_formatter = OutputFormatter()
+    output_formatter.save_results(
+        output_formatter.format_final_output(config, top_sections, refined_subsections), output_path
+    )
+    stages['format'] = time.perf_counter() - start
+    
+    return {
+        'sections': len(sections),
+        'stages': stages,
+        'peak_rss_mb': _peak_rss_mb(resource.RUSAGE_SELF),
+        'workers_peak_rss_mb': _peak_rss_mb(resource.RUSAGE_CHILDREN)
+    }
+
+def _run_isolated(pdf_paths: List[str], config: Dict[str, Any], workers: int, output_path: str) -> Dict[str, Any]:
+    """run_pipeline in a freshly spawned process, with stdout silenced"""
+    with open(os.devnull, 'w') as devnull:
+        sys.stdout = devnull
+        try:
+            return run_pipeline(pdf_paths, config, workers, output_path)
+        finally:
+            sys.stdout = sys.__stdout__
+
+def benchmark_corpus(documents: int, spec_args: Dict[str, Any], workers: int, work_dir: str) -> Dict[str, Any]:
+    """Generate one corpus and measure the pipeline over it"""
+    spec = CorpusSpec(documents=documents, **spec_args)
+    corpus_dir = Path(work_dir) / f"corpus_{documents}"
+    
+    start = time.perf_counter()
+    pdf_paths = generate_corpus(str(corpus_dir), spec)
+    generate_seconds = time.perf_counter() - start
+    config = write_challenge_config(str(corpus_dir / "challenge_config.json"), pdf_paths)
+    
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        run = executor.submit(
+            _run_isolated, pdf_paths, config, workers, str(corpus_dir / "results.json")
+        ).result()
+    
+    pages = documents * spec.pages_per_document
+    stages = run['stages']
+    pipeline_seconds = sum(seconds for stage, seconds in stages.items() if stage != 'load_models')
+    
+    return {
+        'documents': documents,
+        'pages': pages,
+        'sections': run['sections'],
+        'corpus_generation_seconds': generate_seconds,
+        'stage_seconds': stages,
+        'pipeline_seconds': pipeline_seconds,
+        'pages_per_second': pages / stages['extract'] if stages['extract'] else None,
+        'sections_per_second': run['sections'] / stages['score'] if stages['score'] else None,
+        'peak_rss_mb': run['peak_rss_mb'],
+        'workers_peak_rss_mb': run['workers_peak_rss_mb']
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline over growing synthetic corpora")
+    parser.add_argument("--sizes", default="5,20,50", help="comma-separated document counts")
+    parser.add_argument("--pages", type=int, default=8, help="pages per document")
+    parser.add_argument("--sections-per-page", type=int, default=2)
+    parser.add_argument("--keyword-density", type=float, default=0.3)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="PDF extraction processes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--report", default="benchmark_report.json", help="where to write the JSON report")
+    args = parser.parse_args()
+    
+    spec_args = {
+        'pages_per_document': args.pages,
+        'sections_per_page': args.sections_per_page,
+        'keyword_density': args.keyword_density,
+        'seed': args.seed
+    }
+    sizes = [int(size) for size in args.sizes.split(",")]
+    
+    runs = []
+    with tempfile.TemporaryDirectory(prefix="pipeline_benchmark_") as work_dir:
+        for documents in sizes:
+            print(f"📊 Benchmarking {documents} documents x {args.pages} pages...")
+            run = benchmark_corpus(documents, spec_args, args.workers, work_dir)
+            runs.append(run)
+            print(f"  {run['sections']} sections, {run['pipeline_seconds']:.2f}s pipeline, "
+                  f"{run['pages_per_second']:.1f} pages/s, {run['sections_per_second']:.1f} sections/s, "
+                  f"peak RSS {run['peak_rss_mb']:.0f} MB")
+    
+    report = {
+        'created_at': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'workers': args.workers,
+        'sizes': sizes,
+        'corpus_spec': {key: value for key, value in CorpusSpec(**spec_args).to_dict().items() if key != 'documents'},
+        'runs': runs
+    }
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Report written to {args.report}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Synthetic Corpus - Deterministic Travel-Guide PDFs Generated with PyMuPDF
+
+Usage: python -m benchmarks.synthetic_corpus OUTPUT_DIR [--documents 10] [--pages 8] [--seed 0]
+"""
+
+import json
+import random
+import argparse
+import fitz
+from pathlib import Path
+from typing import List, Dict, Any
+
+TRAVEL_KEYWORDS = (
+    "trip plan itinerary group friends college budget hotel hostel beach museum restaurant "
+    "nightlife train bus metro ticket book reserve tour guide coast activities schedule "
+    "cost price address hours directions accommodation cuisine festival visit explore"
+).split()
+
+FILLER_WORDS = (
+    "the a of and to in with for on at from by this that these its their which where when "
+    "region history century people local area during early known many several often usually "
+    "building river hill street square garden season weather light stone family tradition"
+).split()
+
+HEADINGS = [
+    "Planning Your Group Itinerary", "Coastal Adventures For Friends", "Nightlife And Entertainment Tips",
+    "Budget Friendly Restaurants Guide", "History Of The Old Town", "Travel Tips For College Students",
+    "Introduction To The Region", "Things To Do In Nice", "Hotels And Accommodation Options",
+    "CULINARY EXPERIENCES", "Getting Around By Train And Bus", "Day Trips Along The Coast",
+    "Markets And Local Festivals", "Museums And Galleries", "Wine Tasting And Cooking Classes"
+]
+
+PAGE_MARGIN = 50
+LINE_SPACING = 1.3
+
+class CorpusSpec:
+    """Shape of a synthetic corpus; every field has a benchmark-friendly default"""
+    
+    def __init__(self, documents: int = 10, pages_per_document: int = 8, sections_per_page: int = 2,
+                 paragraph_lines: tuple = (8, 16), words_per_line: int = 12,
+                 heading_font: str = "hebo", heading_size: float = 16, body_font: str = "helv",
+                 body_size: float = 10, bold_span_ratio: float = 0.1, keyword_density: float = 0.3,
+                 seed: int = 0):
+        self.documents = documents
+        self.pages_per_document = pages_per_document
+        self.sections_per_page = sections_per_page
+        self.paragraph_lines = paragraph_lines
+        self.words_per_line = words_per_line
+        self.heading_font = heading_font
+        self.heading_size = heading_size
+        self.body_font = body_font
+        self.body_size = body_size
+        self.bold_span_ratio = bold_span_ratio
+        self.keyword_density = keyword_density
+        self.seed = seed
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(vars(self), paragraph_lines=list(self.paragraph_lines))
+
+def _body_line(rng: random.Random, spec: CorpusSpec) -> str:
+    """One line of body text; keyword_density is the share of travel keywords"""
+    words = [
+        rng.choice(TRAVEL_KEYWORDS) if rng.random() < spec.keyword_density else rng.choice(FILLER_WORDS)
+        for _ in range(spec.words_per_line)
+    ]
+    return " ".join(words).capitalize() + "."
+
+def _insert_body_line(page, y: float, text: str, rng: random.Random, spec: CorpusSpec):
+    """Write a body line, occasionally opening with a bold span"""
+    x = PAGE_MARGIN
+    if rng.random() < spec.bold_span_ratio:
+        words = text.split(" ")
+        bold = " ".join(words[:2]) + " "
+        page.insert_text((x, y), bold, fontsize=spec.body_size, fontname="hebo")
+        x += fitz.get_text_length(bold, fontname="hebo", fontsize=spec.body_size)
+        text = " ".join(words[2:])
+    page.insert_text((x, y), text, fontsize=spec.body_size, fontname=spec.body_font)
+
+def generate_document(path: str, spec: CorpusSpec, rng: random.Random) -> int:
+    """Write one PDF and return its page count"""
+    doc = fitz.open()
+    body_step = spec.body_size * LINE_SPACING
+    heading_step = spec.heading_size * LINE_SPACING + 4
+    
+    for _ in range(spec.pages_per_document):
+        page = doc.new_page()
+        bottom = page.rect.height - PAGE_MARGIN
+        y = PAGE_MARGIN + spec.heading_size
+        
+        for _ in range(spec.sections_per_page):
+            if y + heading_step + body_step > bottom:
+                break
+            page.insert_text((PAGE_MARGIN, y), rng.choice(HEADINGS),
+                             fontsize=spec.heading_size, fontname=spec.heading_font)
+            y += heading_step
+            
+            for _ in range(rng.randint(*spec.paragraph_lines)):
+                if y > bottom:
+                    break
+                _insert_body_line(page, y, _body_line(rng, spec), rng, spec)
+                y += body_step
+            y += body_step * 2
+    
+    doc.save(path)
+    doc.close()
+    return spec.pages_per_document
+
+def generate_corpus(output_dir: str, spec: CorpusSpec) -> List[str]:
+    """Write spec.documents PDFs into output_dir; same spec, same bytes"""
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(spec.seed)
+    
+    paths = []
+    for index in range(spec.documents):
+        path = output / f"synthetic_{index:04d}.pdf"
+        generate_document(str(path), spec, rng)
+        paths.append(str(path))
+    return paths
+
+def write_challenge_config(config_path: str, pdf_paths: List[str],
+                           persona: str = "Travel Planner",
+                           job: str = "Plan a trip of 4 days for a group of 10 college friends.") -> Dict[str, Any]:
+    """challenge_config.json describing a generated corpus"""
+    config = {
+        "challenge_info": {
+            "challenge_id": "synthetic",
+            "test_case_name": "synthetic_benchmark",
+            "description": "Synthetic travel corpus"
+        },
+        "documents": [{"filename": Path(path).name, "title": Path(path).stem} for path in pdf_paths],
+        "persona": {"role": persona},
+        "job_to_be_done": {"task": job}
+    }
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=2)
+    return config
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic travel PDF corpus")
+    parser.add_argument("output_dir")
+    parser.add_argument("--documents", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=8, help="pages per document")
+    parser.add_argument("--sections-per-page", type=int, default=2)
+    parser.add_argument("--keyword-density", type=float, default=0.3)
+    parser.add_argument("--bold-span-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    spec = CorpusSpec(documents=args.documents, pages_per_document=args.pages,
+                      sections_per_page=args.sections_per_page, keyword_density=args.keyword_density,
+                      bold_span_ratio=args.bold_span_ratio, seed=args.seed)
+    paths = generate_corpus(args.output_dir, spec)
+    write_challenge_config(str(Path(args.output_dir) / "challenge_config.json"), paths)
+    print(f"✅ Generated {len(paths)} PDFs in {args.output_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+ANN Index - Inverted-File Approximate Nearest Neighbours in NumPy
+"""
+
+import numpy as np
+from typing import Tuple
+from top_k import top_k_indices
+
+class IVFIndex:
+    """Inverted-file index for cosine similarity over embeddings
+    
+    Vectors are L2-normalized and filed under the nearest of n_lists
+    spherical k-means centroids. A search scores the centroids, then only
+    the vectors in the n_probe best lists, so it costs roughly
+    N * n_probe / n_lists dot products instead of N. Results carry the ids
+    given to add(), by default the order vectors were added in.
+    """
+    
+    def __init__(self, dimension: int, n_lists: int = 256, n_probe: int = 8, seed: int = 0):
+        self.dimension = dimension
+        self.n_lists = max(1, n_lists)
+        self.n_probe = max(1, n_probe)
+        self.seed = seed
+        
+        self.centroids = None
+        self._list_vectors = []
+        self._list_ids = []
+        self._size = 0
+    
+    @classmethod
+    def build(cls, vectors: np.ndarray, n_lists: int = None, n_probe: int = 8,
+              seed: int = 0) -> "IVFIndex":
+        """Train on vectors and add them; n_lists defaults to about sqrt(N)"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if n_lists is None:
+            n_lists = int(np.sqrt(len(vectors)))
+        index = cls(vectors.shape[1], n_lists, n_probe, seed)
+        index.train(vectors)
+        index.add(vectors)
+        return index
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """Unit-length float32 rows; all-zero rows stay zero"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.sqrt(np.einsum('ij,ij->i', vectors, vectors))
+        return vectors / np.where(norms > 0, norms, 1.0)[:, None].astype(np.float32)
+    
+    @staticmethod
+    def _assign(data: np.ndarray, centroids: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        """Best centroid of every row, in chunks to bound the score matrix"""
+        assignments = np.empty(len(data), dtype=np.int64)
+        for start in range(0, len(data), chunk_size):
+            assignments[start:start + chunk_size] = np.argmax(
+                data[start:start + chunk_size] @ centroids.T, axis=1
+            )
+        return assignments
+    
+    def train(self, vectors: np.ndarray, iterations: int = 10, sample_size: int = None):
+        """Place the centroids by spherical k-means over a sample of vectors
+        
+        Clears anything added before. With fewer vectors than lists, the
+        number of lists shrinks to the number of vectors.
+        """
+        rng = np.random.default_rng(self.seed)
+        data = np.asarray(vectors, dtype=np.float32)
+        if len(data) == 0:
+            raise ValueError("Cannot train an IVF index on no vectors")
+        
+        sample_size = sample_size or 32 * self.n_lists
+        if len(data) > sample_size:
+            data = data[np.sort(rng.choice(len(data), sample_size, replace=False))]
+        data = self._normalize(data)
+        
+        self.n_lists = min(self.n_lists, len(data))
+        centroids = data[rng.choice(len(data), self.n_lists, replace=False)]
+        
+        for _ in range(iterations):
+            assignments = self._assign(data, centroids)
+            counts = np.bincount(assignments, minlength=self.n_lists)
+            filled = counts > 0
+            
+            # Sum each cluster's members with one reduceat over the sorted rows
+            sums = np.zeros_like(centroids)
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            members = data[np.argsort(assignments, kind='stable')]
+            sums[filled] = np.add.reduceat(members, starts[filled], axis=0)
+            
+            # Empty clusters restart from random sample vectors
+            empty = np.flatnonzero(~filled)
+            if len(empty):
+                sums[empty] = data[rng.choice(len(data), len(empty), replace=False)]
+            centroids = self._normalize(sums)
+        
+        self.centroids = centroids
+        self._list_vectors = [np.zeros((0, self.dimension), dtype=np.float32)] * self.n_lists
+        self._list_ids = [np.zeros(0, dtype=np.int64)] * self.n_lists
+        self._size = 0
+    
+    def add(self, vectors: np.ndarray, ids: np.ndarray = None) -> np.ndarray:
+        """File vectors under their nearest centroid, keeping the trained centroids
+        
+        ids default to consecutive positions after the vectors already
+        added. Returns the ids used.
+        """
+        if self.centroids is None:
+            raise ValueError("Train the IVF index before adding vectors")
+        
+        data = self._normalize(vectors)
+        if ids is None:
+            ids = np.arange(self._size, self._size + len(data), dtype=np.int64)
+        else:
+            ids = np.asarray(ids, dtype=np.int64)
+        
+        assignments = self._assign(data, self.centroids)
+        order = np.argsort(assignments, kind='stable')
+        counts = np.bincount(assignments, minlength=self.n_lists)
+        bounds = np.concatenate(([0], np.cumsum(counts)))
+        
+        for list_id in np.flatnonzero(counts):
+            rows = order[bounds[list_id]:bounds[list_id + 1]]
+            self._list_vectors[list_id] = np.concatenate((self._list_vectors[list_id], data[rows]))
+            self._list_ids[list_id] = np.concatenate((self._list_ids[list_id], ids[rows]))
+        
+        self._size += len(data)
+        return ids
+    
+    def search(self, query: np.ndarray, k: int, n_probe: int = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(ids, cosine scores) of the approximate k nearest vectors, best first"""
+        query = self._normalize(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        if self.centroids is None or not query.any():
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        
+        probed = top_k_indices(self.centroids @ query, n_probe or self.n_probe)
+        probed = probed[[len(self._list_ids[list_id]) > 0 for list_id in probed]]
+        if len(probed) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        
+        # Score each probed list in place rather than gathering its vectors
+        scores = np.concatenate([self._list_vectors[list_id] @ query for list_id in probed])
+        ids = np.concatenate([self._list_ids[list_id] for list_id in probed])
+        
+        best = top_k_indices(scores, k)
+        return ids[best], scores[best]
+    
+    def exact_search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Brute-force search over every vector, the reference for recall"""
+        return self.search(query, k, n_probe=self.n_lists)
+    
+    def recall_at_k(self, queries: np.ndarray, k: int = 10, n_probe: int = None) -> float:
+        """Mean share of the exact top k that search() also returns"""
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dimension)
+        recalls = []
+        for query in queries:
+            exact_ids, _ = self.exact_search(query, k)
+            if len(exact_ids) == 0:
+                continue
+            approximate_ids, _ = self.search(query, k, n_probe)
+            recalls.append(len(np.intersect1d(exact_ids, approximate_ids)) / len(exact_ids))
+        return float(np.mean(recalls)) if recalls else 1.0
+    
+    def save(self, path: str):
+        """Write centroids, lists and settings to one .npz file"""
+        if self.centroids is None:
+            raise ValueError("Cannot save an untrained IVF index")
+        
+        counts = np.array([len(ids) for ids in self._list_ids], dtype=np.int64)
+        np.savez(
+            path,
+            settings=np.array([self.dimension, self.n_lists, self.n_probe, self.seed], dtype=np.int64),
+            centroids=self.centroids,
+            counts=counts,
+            vectors=np.concatenate(self._list_vectors),
+            ids=np.concatenate(self._list_ids)
+        )
+    
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        """Read an index written by save()"""
+        with np.load(path, allow_pickle=False) as data:
+            dimension, n_lists, n_probe, seed = (int(value) for value in data['settings'])
+            index = cls(dimension, n_lists, n_probe, seed)
+            index.centroids = data['centroids']
+            
+            bounds = np.cumsum(data['counts'])[:-1]
+            index._list_vectors = np.split(data['vectors'], bounds)
+            index._list_ids = np.split(data['ids'], bounds)
+            index._size = int(data['counts'].sum())
+        return index
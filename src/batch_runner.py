@@ -0,0 +1,125 @@
+"""
+Batch Runner - Many Persona/Job Queries over One Extracted Corpus
+"""
+
+import re
+import json
+import time
+from pathlib import Path
+from typing import List, Dict, Any
+import instrumentation
+
+def load_queries(queries_path: str) -> List[Dict[str, Any]]:
+    """challenge_config-style queries from a JSON list or {"queries": [...]}"""
+    with open(queries_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    
+    queries = data['queries'] if isinstance(data, dict) else data
+    if not isinstance(queries, list) or not queries:
+        raise ValueError(f"No queries found in {queries_path}")
+    return queries
+
+def results_filename(index: int, query: Dict[str, Any]) -> str:
+    """Stable per-query output name, e.g. 003_travel_planner.json"""
+    label = query.get('challenge_info', {}).get('test_case_name') or query['persona']['role']
+    slug = re.sub(r'[^a-z0-9]+', '_', label.lower()).strip('_') or 'query'
+    return f"{index:03d}_{slug}.json"
+
+def answer_query(query: Dict[str, Any], features: Dict[str, Any], relevance_scorer,
+                 subsection_extractor, output_formatter, reranker=None,
+                 candidate_count: int = 7) -> Dict[str, Any]:
+    """Score, rerank and refine one query over prepared corpus features
+    
+    Returns the results.json structure without saving it.
+    """
+    persona = query["persona"]["role"]
+    job_description = query["job_to_be_done"]["task"]
+    
+    with instrumentation.span("score"):
+        scored_sections = relevance_scorer.score_all_sections(
+            features['sections'], persona, job_description, top_k=candidate_count, features=features
+        )
+    
+    if reranker is not None:
+        with instrumentation.span("rerank"):
+            scored_sections = reranker.rerank(scored_sections, f"{persona}: {job_description}")
+    
+    top_sections = relevance_scorer.get_top_sections_for_target_output(scored_sections, top_k=7)
+    
+    with instrumentation.span("subsections"):
+        refined_subsections = subsection_extractor.extract_refined_subsections(
+            top_sections, persona, job_description
+        )
+    
+    with instrumentation.span("format_output"):
+        return output_formatter.format_final_output(query, top_sections, refined_subsections)
+
+def run_batch(queries: List[Dict[str, Any]], pdf_dir: str, output_dir: str, pdf_processor,
+              relevance_scorer, subsection_extractor, output_formatter, max_workers: int = None,
+              section_cache=None, reranker=None, candidate_count: int = 7) -> List[Dict[str, Any]]:
+    """Extract the union of all queries' documents once, then answer every query
+    
+    Each query is scored only against the sections of its own documents.
+    Queries naming the same document set share one set of corpus features
+    (BM25 index and section embeddings); sections repeated across
+    different document sets are still embedded only once through the
+    embedding cache. Writes one results file per query plus
+    batch_index.json, and returns the index entries.
+    """
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+    
+    # Union of every query's documents, in first-seen order
+    filenames = []
+    for query in queries:
+        for doc_info in query['documents']:
+            if doc_info['filename'] not in filenames and (Path(pdf_dir) / doc_info['filename']).exists():
+                filenames.append(doc_info['filename'])
+    
+    print(f"\n📄 Extracting {len(filenames)} documents shared by {len(queries)} queries...")
+    with instrumentation.span("extract"):
+        document_sections = pdf_processor.extract_documents(
+            [str(Path(pdf_dir) / filename) for filename in filenames], max_workers, cache=section_cache
+        )
+    sections_by_document = dict(zip(filenames, document_sections))
+    print(f"✅ Total sections: {sum(len(sections) for sections in document_sections)}")
+    
+    features_by_documents = {}
+    index = []
+    
+    for query_number, query in enumerate(queries, start=1):
+        start_time = time.perf_counter()
+        persona = query["persona"]["role"]
+        job_description = query["job_to_be_done"]["task"]
+        print(f"\n🎯 Query {query_number}/{len(queries)}: {persona} - {job_description}")
+        
+        document_set = tuple(
+            doc_info['filename'] for doc_info in query['documents'] if doc_info['filename'] in sections_by_document
+        )
+        if document_set not in features_by_documents:
+            sections = [section for filename in document_set for section in sections_by_document[filename]]
+            features_by_documents[document_set] = relevance_scorer.build_corpus_features(sections)
+        features = features_by_documents[document_set]
+        
+        results_path = output / results_filename(query_number, query)
+        final_output = answer_query(
+            query, features, relevance_scorer, subsection_extractor, output_formatter,
+            reranker=reranker, candidate_count=candidate_count
+        )
+        output_formatter.save_results(final_output, str(results_path))
+        
+        index.append({
+            'query': query_number,
+            'persona': persona,
+            'job_to_be_done': job_description,
+            'documents': len(document_set),
+            'sections': len(features['sections']),
+            'results_file': results_path.name,
+            'seconds': time.perf_counter() - start_time
+        })
+    
+    with open(output / "batch_index.json", 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=4, ensure_ascii=False)
+    
+    print(f"\n✅ Batch complete: {len(queries)} results files in {output}")
+    return index
@@ -0,0 +1,96 @@
+"""
+BM25 Index - Inverted Index Lexical Retrieval over Extracted Sections
+"""
+
+import re
+import numpy as np
+from collections import Counter
+from typing import List, Dict
+
+from top_k import top_k_indices
+
+class BM25Index:
+    """Okapi BM25 over a fixed collection of section texts
+    
+    Documents are tokenized once at build time. Each term's postings are
+    held as NumPy arrays of document ids and term frequencies, and the
+    length normalization is precomputed per document, so a query only
+    touches the postings of its own terms.
+    """
+    
+    TOKEN_PATTERN = re.compile(r'\b[a-z]{2,}\b')
+    
+    def __init__(self, documents: List[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_count = len(documents)
+        
+        postings_docs = {}
+        postings_freqs = {}
+        doc_lengths = np.zeros(self.doc_count, dtype=np.float32)
+        
+        for doc_id, text in enumerate(documents):
+            terms = self.tokenize(text)
+            doc_lengths[doc_id] = len(terms)
+            for term, freq in Counter(terms).items():
+                postings_docs.setdefault(term, []).append(doc_id)
+                postings_freqs.setdefault(term, []).append(freq)
+        
+        self.doc_lengths = doc_lengths
+        self.avg_doc_length = float(doc_lengths.mean()) if self.doc_count else 0.0
+        
+        self.postings = {
+            term: (np.array(doc_ids, dtype=np.int32), np.array(postings_freqs[term], dtype=np.float32))
+            for term, doc_ids in postings_docs.items()
+        }
+        
+        # Non-negative IDF variant: terms in most documents still count a little
+        self.idf = {
+            term: float(np.log(1.0 + (self.doc_count - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5)))
+            for term, (doc_ids, _) in self.postings.items()
+        }
+        
+        # Denominator term k1 * (1 - b + b * |d| / avgdl), fixed per document
+        if self.avg_doc_length > 0:
+            self._length_norm = k1 * (1.0 - b + b * doc_lengths / self.avg_doc_length)
+        else:
+            self._length_norm = np.full(self.doc_count, k1, dtype=np.float32)
+    
+    @classmethod
+    def tokenize(cls, text: str) -> List[str]:
+        """Lowercased word tokens, the same scheme SimpleTFIDF uses"""
+        return cls.TOKEN_PATTERN.findall(text.lower())
+    
+    def query_terms(self, query: str) -> List[str]:
+        """Distinct query terms that occur in the collection"""
+        return [term for term in dict.fromkeys(self.tokenize(query)) if term in self.postings]
+    
+    def score(self, query: str) -> np.ndarray:
+        """BM25 score of every document for the query"""
+        scores = np.zeros(self.doc_count, dtype=np.float32)
+        
+        for term in self.query_terms(query):
+            doc_ids, freqs = self.postings[term]
+            scores[doc_ids] += self.idf[term] * freqs * (self.k1 + 1.0) / (freqs + self._length_norm[doc_ids])
+        
+        return scores
+    
+    def candidates(self, query: str) -> np.ndarray:
+        """Sorted ids of documents sharing at least one term with the query"""
+        terms = self.query_terms(query)
+        if not terms:
+            return np.zeros(0, dtype=np.int32)
+        return np.unique(np.concatenate([self.postings[term][0] for term in terms]))
+    
+    def top_k(self, query: str, k: int = 10) -> List[int]:
+        """Ids of the k best-scoring documents, best first"""
+        return top_k_indices(self.score(query), k).tolist()
+    
+    def stats(self) -> Dict[str, float]:
+        """Collection size figures for logging"""
+        return {
+            'documents': self.doc_count,
+            'terms': len(self.postings),
+            'postings': int(sum(len(doc_ids) for doc_ids, _ in self.postings.values())),
+            'avg_doc_length': self.avg_doc_length
+        }
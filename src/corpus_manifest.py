@@ -0,0 +1,231 @@
+"""
+Corpus Manifest - Incremental Processing of a Document Collection
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+import numpy as np
+from pathlib import Path
+from typing import List, Dict, Any, Tuple
+from section_cache import SectionCache, FILE_MODE
+import instrumentation
+
+class CorpusManifest:
+    """Per-document record of what has been extracted and embedded
+    
+    manifest.json in store_dir maps each PDF path to its size, mtime,
+    content hash, extraction config fingerprint, the file holding its
+    sections and the embedding store holding their embeddings (keyed by
+    section content; build_pipeline opens one in store_dir/embeddings
+    unless EMBEDDING_STORE_DIR names another). Documents whose size and
+    mtime are unchanged are trusted without hashing, so a run over a large
+    collection with a few edits only extracts and embeds those edits.
+    """
+    
+    MANIFEST_VERSION = 2
+    
+    def __init__(self, store_dir: str):
+        self.store_dir = Path(store_dir)
+        self.documents_dir = self.store_dir / "documents"
+        self.documents_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.store_dir / "manifest.json"
+        
+        self.entries = self._load()
+        self.last_diff = {'added': [], 'modified': [], 'unchanged': [], 'deleted': []}
+    
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        
+        if manifest.get('version') != self.MANIFEST_VERSION:
+            return {}
+        return manifest.get('documents', {})
+    
+    def save(self) -> bool:
+        """Write manifest.json atomically; safe with concurrent writers"""
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.store_dir, suffix='.tmp')
+            os.fchmod(fd, FILE_MODE)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'version': self.MANIFEST_VERSION, 'documents': self.entries}, f, indent=2)
+            os.replace(tmp_path, self.manifest_path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"⚠️ Corpus manifest write failed: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return False
+        return True
+    
+    @staticmethod
+    def artifact_key(content_hash: str, config_fingerprint: str) -> str:
+        """Name shared by the stored artifacts of one content under one config"""
+        return hashlib.sha256(f"{content_hash}:{config_fingerprint}".encode('utf-8')).hexdigest()
+    
+    def diff(self, pdf_paths: List[str], config_fingerprint: str) -> Dict[str, List[str]]:
+        """Classify pdf_paths against the manifest without changing it
+        
+        Returns 'added', 'modified' and 'unchanged' paths, and 'deleted'
+        manifest paths whose file no longer exists. A document counts as
+        modified when its content or the extraction config changed.
+        """
+        result = {'added': [], 'modified': [], 'unchanged': [], 'deleted': []}
+        for pdf_path, status, _, _ in self._classify(pdf_paths, config_fingerprint):
+            result[status].append(pdf_path)
+        result['deleted'] = [path for path in self.entries if not os.path.exists(path)]
+        return result
+    
+    def _classify(self, pdf_paths: List[str], config_fingerprint: str) -> List[Tuple[str, str, os.stat_result, str]]:
+        """(path, status, stat, content hash) for each path"""
+        classified = []
+        for pdf_path in pdf_paths:
+            stat = os.stat(pdf_path)
+            entry = self.entries.get(pdf_path)
+            
+            # Same size and mtime: trust the recorded hash instead of re-reading the file
+            if entry is not None and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+                content_hash = entry['sha256']
+            else:
+                content_hash = SectionCache.hash_file(pdf_path)
+                instrumentation.count('manifest_files_hashed')
+            
+            if entry is None:
+                status = 'added'
+            elif (entry['sha256'] != content_hash or entry['config'] != config_fingerprint
+                  or not (self.store_dir / entry['sections_file']).exists()):
+                status = 'modified'
+            else:
+                status = 'unchanged'
+            classified.append((pdf_path, status, stat, content_hash))
+        return classified
+    
+    def sync(self, pdf_paths: List[str], pdf_processor, semantic_analyzer,
+             max_workers: int = None) -> Tuple[List[List[Dict[str, Any]]], np.ndarray]:
+        """Bring the manifest up to date with pdf_paths and return their contents
+        
+        Only added or modified documents are extracted, bypassing any
+        section cache: the manifest keeps their sections itself and has
+        already hashed them. Embeddings come
+        from semantic_analyzer.embed_sections, which with an embedding
+        store only embeds sections it has not seen. Entries whose file was
+        deleted are dropped. Returns the sections of each document, in
+        pdf_paths order, and one embedding matrix whose rows follow those
+        sections in the same order.
+        """
+        fingerprint = pdf_processor.config_fingerprint()
+        classified = self._classify(pdf_paths, fingerprint)
+        statuses = [status for _, status, _, _ in classified]
+        replaced_files = set()
+        
+        document_sections = [None] * len(pdf_paths)
+        for i, pdf_path in enumerate(pdf_paths):
+            if statuses[i] == 'unchanged':
+                document_sections[i] = self._read_sections(self.entries[pdf_path])
+                if document_sections[i] is None:
+                    statuses[i] = 'modified'
+        
+        stale = [i for i, status in enumerate(statuses) if status != 'unchanged']
+        extracted = pdf_processor.extract_documents(
+            [pdf_paths[i] for i in stale], max_workers
+        ) if stale else []
+        
+        for i, sections in zip(stale, extracted):
+            pdf_path, _, stat, content_hash = classified[i]
+            document_sections[i] = sections
+            old_entry = self.entries.pop(pdf_path, None)
+            if old_entry is not None:
+                replaced_files.update(self._entry_files(old_entry))
+            
+            # Empty output usually means a parse error; do not pin it in the manifest
+            if not sections:
+                continue
+            
+            key = self.artifact_key(content_hash, fingerprint)
+            entry = {
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'sha256': content_hash,
+                'config': fingerprint,
+                'sections_file': f"documents/{key}.json",
+                'section_count': len(sections),
+                'embeddings_store': None
+            }
+            self._write_atomic(self.store_dir / entry['sections_file'],
+                               lambda f: json.dump(sections, f, ensure_ascii=False))
+            self.entries[pdf_path] = entry
+        
+        # Same bytes may be stored under another filename
+        for pdf_path, sections in zip(pdf_paths, document_sections):
+            for section in sections:
+                section['document'] = Path(pdf_path).name
+        
+        # Touched but identical files: record the new stat so later runs skip hashing them
+        for (pdf_path, _, stat, _), status in zip(classified, statuses):
+            if status == 'unchanged':
+                self.entries[pdf_path]['size'] = stat.st_size
+                self.entries[pdf_path]['mtime_ns'] = stat.st_mtime_ns
+        
+        embeddings = semantic_analyzer.embed_sections(
+            [section for sections in document_sections for section in sections]
+        )
+        store = semantic_analyzer.embedding_store()
+        for pdf_path in pdf_paths:
+            if pdf_path in self.entries:
+                self.entries[pdf_path]['embeddings_store'] = str(store.matrix_path) if store is not None else None
+        
+        deleted = [path for path in self.entries if not os.path.exists(path)]
+        for path in deleted:
+            replaced_files.update(self._entry_files(self.entries.pop(path)))
+        self._remove_unreferenced(replaced_files)
+        self.save()
+        
+        self.last_diff = {'added': [], 'modified': [], 'unchanged': [], 'deleted': deleted}
+        for pdf_path, status in zip(pdf_paths, statuses):
+            self.last_diff[status].append(pdf_path)
+        instrumentation.count('manifest_documents_reused', len(self.last_diff['unchanged']))
+        return document_sections, embeddings
+    
+    def _read_sections(self, entry: Dict[str, Any]):
+        try:
+            with open(self.store_dir / entry['sections_file'], 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    @staticmethod
+    def _entry_files(entry: Dict[str, Any]) -> List[str]:
+        return [entry['sections_file']]
+    
+    def _remove_unreferenced(self, files):
+        """Delete stored files no remaining entry points to"""
+        referenced = {name for entry in self.entries.values() for name in self._entry_files(entry)}
+        for name in set(files) - referenced:
+            try:
+                (self.store_dir / name).unlink()
+            except FileNotFoundError:
+                pass
+    
+    def _write_atomic(self, path: Path, write_fn) -> bool:
+        """Write through a private temp file renamed into place"""
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.documents_dir, suffix='.tmp')
+            os.fchmod(fd, FILE_MODE)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                write_fn(f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"⚠️ Corpus manifest write failed: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return False
+        return True
+    
+    def stats(self) -> Dict[str, int]:
+        """Counts from the last sync() for the run summary"""
+        return {status: len(paths) for status, paths in self.last_diff.items()}
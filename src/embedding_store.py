@@ -0,0 +1,161 @@
+"""
+Embedding Store - Append-Only Memory-Mapped Section Embeddings
+"""
+
+import os
+import fcntl
+import hashlib
+import threading
+import numpy as np
+from pathlib import Path
+from typing import List, Dict, Any
+
+class EmbeddingStore:
+    """Append-only float32 embedding matrix on disk, read through np.memmap
+
+    <name>.f32 holds one row of `dimension` float32 values per stored text
+    and <name>.keys the matching 16-byte content hashes in row order. A
+    row is written before its key and never changes afterwards, so the
+    key file alone says which rows are complete. Readers map the matrix
+    read-only and share its pages through the OS page cache; writers in
+    any process serialize on an exclusive flock. Rows are never evicted,
+    so once max_bytes is reached new texts are no longer stored.
+    """
+
+    KEY_BYTES = 16
+
+    def __init__(self, store_dir: str, name: str, dimension: int, max_bytes: int = None):
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.name = name
+        self.dimension = dimension
+        self.max_bytes = max_bytes
+        self.matrix_path = self.store_dir / f"{name}.f32"
+        self.keys_path = self.store_dir / f"{name}.keys"
+        self.lock_path = self.store_dir / f"{name}.lock"
+
+        self._lock = threading.RLock()
+        self._index = {}
+        self._rows = 0
+        self._matrix = np.zeros((0, dimension), dtype=np.float32)
+
+        self.hits = 0
+        self.misses = 0
+        self.unstored = 0
+        self.refresh()
+
+    @staticmethod
+    def make_key(text: str) -> bytes:
+        """Content hash a text is stored under"""
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=EmbeddingStore.KEY_BYTES).digest()
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def refresh(self):
+        """Pick up rows appended since the last refresh, by any process"""
+        with self._lock:
+            try:
+                with open(self.keys_path, 'rb') as f:
+                    f.seek(self._rows * self.KEY_BYTES)
+                    data = f.read()
+            except FileNotFoundError:
+                return
+
+            # A torn trailing key belongs to an unfinished append
+            new_rows = len(data) // self.KEY_BYTES
+            if not new_rows:
+                return
+
+            matrix = np.memmap(self.matrix_path, dtype=np.float32, mode='r',
+                               shape=(self._rows + new_rows, self.dimension))
+            for i in range(new_rows):
+                key = data[i * self.KEY_BYTES:(i + 1) * self.KEY_BYTES]
+                self._index.setdefault(key, self._rows + i)
+            self._rows += new_rows
+            self._matrix = matrix
+
+    def lookup(self, keys: List[bytes]) -> np.ndarray:
+        """Row of each key, -1 where the key is not stored"""
+        rows = np.fromiter((self._index.get(key, -1) for key in keys), dtype=np.int64, count=len(keys))
+        found = int(np.count_nonzero(rows >= 0))
+        with self._lock:
+            self.hits += found
+            self.misses += len(keys) - found
+        return rows
+
+    def append(self, keys: List[bytes], vectors: np.ndarray) -> np.ndarray:
+        """Store vectors under keys not stored yet and return the row of every key
+
+        Keys that did not fit under max_bytes get row -1.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(keys), self.dimension)
+
+        with self._lock, open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                # Another process may have stored some of these meanwhile
+                self.refresh()
+                new = {}
+                for i, key in enumerate(keys):
+                    if key not in self._index and key not in new:
+                        new[key] = i
+
+                if new and self.max_bytes is not None:
+                    room = max(0, self.max_bytes // (self.dimension * 4) - self._rows)
+                    if len(new) > room:
+                        if not self.unstored:
+                            print(f"⚠️ Embedding store {self.name} is full "
+                                  f"({self.max_bytes / 1024 / 1024:.0f} MB); new embeddings are not stored")
+                        self.unstored += len(new) - room
+                        new = dict(list(new.items())[:room])
+
+                if new:
+                    self._write_rows(list(new), vectors[list(new.values())])
+                    self.refresh()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        return np.fromiter((self._index.get(key, -1) for key in keys), dtype=np.int64, count=len(keys))
+
+    def _write_rows(self, keys: List[bytes], vectors: np.ndarray):
+        """Append rows, then their keys; call with the flock held"""
+        committed = self._rows
+
+        # Anything past the committed rows is left over from an interrupted append
+        with open(self.matrix_path, 'ab') as f:
+            f.truncate(committed * self.dimension * 4)
+            f.write(vectors.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        with open(self.keys_path, 'ab') as f:
+            f.truncate(committed * self.KEY_BYTES)
+            f.write(b''.join(keys))
+
+    def view(self, rows: np.ndarray) -> np.ndarray:
+        """Read-only (len(rows), dimension) matrix of the given rows
+
+        Consecutive ascending rows come back as a slice of the memory map,
+        without copying; any other selection is gathered into a new array.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        matrix = self._matrix
+        if len(rows) == 0:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        if rows[0] >= 0 and np.all(np.diff(rows) == 1):
+            return np.asarray(matrix[rows[0]:rows[0] + len(rows)])
+        return np.asarray(matrix[rows])
+
+    def stats(self) -> Dict[str, Any]:
+        """Size and hit counters for the run summary"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'rows': self._rows,
+                'bytes': self._rows * self.dimension * 4,
+                'hits': self.hits,
+                'misses': self.misses,
+                'unstored': self.unstored,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
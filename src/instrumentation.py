@@ -0,0 +1,168 @@
+"""
+Instrumentation - Nested Timed Spans and Counters for a Run Report
+"""
+
+import json
+import time
+import threading
+from collections import Counter
+from typing import Dict, Any
+
+# Process-wide recorder state; everything is a no-op until enable() is called
+_ENABLED = False
+_LOCK = threading.Lock()
+_LOCAL = threading.local()
+_COUNTERS = Counter()
+_ROOT = None
+_STARTED_AT = None
+
+class _SpanNode:
+    """Aggregated timings of every span with one name under one parent"""
+    
+    __slots__ = ('seconds', 'calls', 'children')
+    
+    def __init__(self):
+        self.seconds = 0.0
+        self.calls = 0
+        self.children = {}
+    
+    def child(self, name: str) -> "_SpanNode":
+        node = self.children.get(name)
+        if node is None:
+            with _LOCK:
+                node = self.children.setdefault(name, _SpanNode())
+        return node
+    
+    def to_dict(self) -> Dict[str, Any]:
+        result = {'seconds': self.seconds, 'calls': self.calls}
+        if self.children:
+            result['children'] = {name: node.to_dict() for name, node in self.children.items()}
+        return result
+    
+    def merge(self, data: Dict[str, Any]):
+        """Add a to_dict() tree (e.g. from a worker process) into this node"""
+        with _LOCK:
+            self.seconds += data.get('seconds', 0.0)
+            self.calls += data.get('calls', 0)
+        for name, child in data.get('children', {}).items():
+            self.child(name).merge(child)
+
+class _NullSpan:
+    """Shared do-nothing span handed out while instrumentation is disabled"""
+    
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class _TimedSpan:
+    __slots__ = ('name', 'node', 'start')
+    
+    def __init__(self, name: str):
+        self.name = name
+    
+    def __enter__(self):
+        stack = _span_stack()
+        self.node = stack[-1].child(self.name)
+        stack.append(self.node)
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        _span_stack().pop()
+        with _LOCK:
+            self.node.seconds += elapsed
+            self.node.calls += 1
+        return False
+
+def _span_stack():
+    """Open spans of the current thread; new threads start at the root"""
+    stack = getattr(_LOCAL, 'stack', None)
+    if stack is None or stack[0] is not _ROOT:
+        stack = _LOCAL.stack = [_ROOT]
+    return stack
+
+def enable():
+    """Start recording; clears anything recorded before"""
+    global _ENABLED
+    reset()
+    _ENABLED = True
+
+def disable():
+    global _ENABLED
+    _ENABLED = False
+
+def is_enabled() -> bool:
+    return _ENABLED
+
+def reset():
+    """Drop all spans and counters"""
+    global _ROOT, _STARTED_AT
+    with _LOCK:
+        _COUNTERS.clear()
+        _ROOT = _SpanNode()
+        _STARTED_AT = time.time()
+
+def span(name: str):
+    """Context manager timing a named stage, nested under the open span
+    
+    Repeated spans with the same name and parent are aggregated into one
+    node with a call count. Disabled, this returns a shared no-op object.
+    """
+    if not _ENABLED:
+        return _NULL_SPAN
+    return _TimedSpan(name)
+
+def count(name: str, amount: int = 1):
+    """Add amount to a named counter"""
+    if _ENABLED:
+        with _LOCK:
+            _COUNTERS[name] += amount
+
+def snapshot() -> Dict[str, Any]:
+    """Spans and counters recorded so far, as plain data"""
+    if _ROOT is None:
+        return {'spans': {}, 'counters': {}}
+    with _LOCK:
+        counters = dict(_COUNTERS)
+    return {'spans': _ROOT.to_dict().get('children', {}), 'counters': counters}
+
+def drain() -> Dict[str, Any]:
+    """snapshot() followed by reset(), for shipping worker data to the parent"""
+    data = snapshot()
+    reset()
+    return data
+
+def merge(data: Dict[str, Any]):
+    """Fold a worker's drain() into the current span and the counters
+    
+    Worker span times add up across processes, so below a parallel stage
+    they measure total work rather than wall time.
+    """
+    if not _ENABLED or not data:
+        return
+    _span_stack()[-1].merge({'children': data.get('spans', {})})
+    with _LOCK:
+        _COUNTERS.update(data.get('counters', {}))
+
+def write_report(path: str, **extra) -> bool:
+    """Write the run report JSON; extra keys are stored alongside"""
+    report = {
+        'started_at': time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(_STARTED_AT)) if _STARTED_AT else None,
+        'wall_seconds': time.time() - _STARTED_AT if _STARTED_AT else 0.0,
+        **snapshot(),
+        **extra
+    }
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        return True
+    except (OSError, TypeError, ValueError) as e:
+        print(f"⚠️ Run report write failed: {e}")
+        return False
@@ -0,0 +1,78 @@
+"""
+Keyword Matcher - Shared Multi-Keyword Substring Matching
+"""
+
+from typing import List, Dict, Set
+
+class KeywordMatcher:
+    """Matches named keyword sets against text, built once per keyword set
+    
+    A keyword hits when it occurs anywhere in the text as a substring, the
+    same semantics as `keyword in text`. Keywords are lowercased and
+    deduplicated once when the matcher is built, then scanned one by one.
+    Every set in the pipeline has at most a few dozen keywords, where
+    CPython's C substring search beats a Python-level single-pass automaton.
+    """
+    
+    def __init__(self, keyword_sets: Dict[str, List[str]]):
+        # Distinct lowercased keywords shared across categories
+        keyword_ids = {}
+        self.category_keyword_ids = {}
+        
+        for category, keywords in keyword_sets.items():
+            ids = []
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if keyword not in keyword_ids:
+                    keyword_ids[keyword] = len(keyword_ids)
+                ids.append(keyword_ids[keyword])
+            self.category_keyword_ids[category] = ids
+        
+        self.keywords = list(keyword_ids)
+        self._category_scan_lists = {
+            category: [(keyword_id, self.keywords[keyword_id]) for keyword_id in dict.fromkeys(ids)]
+            for category, ids in self.category_keyword_ids.items()
+        }
+    
+    def find(self, text: str, categories: List[str] = None) -> Set[int]:
+        """Ids of the distinct keywords occurring in an already-lowercased text
+        
+        categories limits the substring scans to those categories' keywords.
+        """
+        if categories is None:
+            return {i for i, keyword in enumerate(self.keywords) if keyword in text}
+        return {
+            keyword_id
+            for category in categories
+            for keyword_id, keyword in self._category_scan_lists[category]
+            if keyword in text
+        }
+    
+    def contains_any(self, text: str, category: str) -> bool:
+        """Whether any keyword of one category occurs in the text"""
+        return any(keyword in text for _, keyword in self._category_scan_lists[category])
+    
+    def count(self, text: str, categories: List[str] = None) -> Dict[str, int]:
+        """Number of each category's keywords present in the text"""
+        if categories is None:
+            categories = list(self.category_keyword_ids)
+        
+        found = self.find(text, categories)
+        return {
+            category: sum(1 for keyword_id in self.category_keyword_ids[category] if keyword_id in found)
+            for category in categories
+        }
+    
+    def matches(self, text: str, categories: List[str] = None) -> Dict[str, List[str]]:
+        """Keywords present in the text, per category"""
+        if categories is None:
+            categories = list(self.category_keyword_ids)
+        
+        found = self.find(text, categories)
+        return {
+            category: [
+                self.keywords[keyword_id]
+                for keyword_id in self.category_keyword_ids[category] if keyword_id in found
+            ]
+            for category in categories
+        }
@@ -6,7 +6,151 @@ import json
 import time
 import sys
 import os
+from itertools import chain
 from pathlib import Path
+from typing import Dict, Any
+
+def print_run_summary(start_time, model_loader, embedding_model, section_cache,
+                      report_path: str, embedding_store=None, **report_extra):
+    """Print final metrics and, with RUN_REPORT=1, write the run report"""
+    import instrumentation
+    
+    total_time = time.time() - start_time
+    print(f"\n⏱️  Processing time: {total_time:.1f}s")
+    if section_cache is not None:
+        cache_stats = section_cache.stats()
+        print(f"🗄️  Section cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+              f"{cache_stats['evictions']} evictions")
+    if model_loader.get_model_stats():
+        print("📦 Models loaded on demand:")
+        model_loader.print_model_report()
+    if embedding_model.is_loaded and embedding_model.cache is not None:
+        embedding_stats = embedding_model.cache.stats()
+        print(f"🧮 Embedding cache: {embedding_stats['hits']} hits, {embedding_stats['misses']} misses "
+              f"({embedding_stats['hit_rate']:.0%} hit rate)")
+    if embedding_store is not None:
+        store_stats = embedding_store.stats()
+        print(f"🧊 Embedding store: {store_stats['hits']} reused, {store_stats['misses']} new, "
+              f"{store_stats['rows']} rows ({store_stats['bytes'] / 1024 / 1024:.1f} MB)"
+              + (f", {store_stats['unstored']} not stored (full)" if store_stats['unstored'] else ""))
+    
+    if instrumentation.is_enabled():
+        instrumentation.write_report(
+            report_path,
+            **report_extra,
+            models=model_loader.get_model_stats(),
+            section_cache=section_cache.stats() if section_cache is not None else None,
+            embedding_cache=embedding_model.cache.stats()
+            if embedding_model.is_loaded and embedding_model.cache is not None else None,
+            embedding_store=embedding_store.stats() if embedding_store is not None else None
+        )
+        print(f"📈 Run report saved to {report_path}")
+    print("🎯 Target output optimization completed!")
+
+def build_pipeline() -> Dict[str, Any]:
+    """Create the pipeline components from the runtime settings in the environment
+    
+    Expects /app/src on sys.path. Models are lazy handles, so building the
+    pipeline loads none of them.
+    """
+    from model_loader import OfflineModelLoader
+    from pdf_processor import PDFProcessor, available_cpu_count
+    from semantic_analyzer import SemanticAnalyzer
+    from relevance_scorer import RelevanceScorer
+    from subsection_extractor import SubsectionExtractor
+    from output_formatter import OutputFormatter
+    from section_cache import SectionCache
+    from corpus_manifest import CorpusManifest
+    from reranker import CascadeReranker
+    
+    # Model handles load on first use, so runs that never need a model skip its cost
+    print("📥 Preparing on-demand models...")
+    model_loader = OfflineModelLoader()
+    
+    nlp_model = model_loader.lazy(model_loader.load_spacy_pipeline, "sentences")
+    
+    # The cross-encoder is only loaded when second-stage reranking is on
+    rerank_top_n = int(os.environ.get("RERANK_TOP_N", "0"))
+    reranker = None
+    if rerank_top_n > 0:
+        budget_ms = float(os.environ.get("RERANK_BUDGET_MS", "0"))
+        reranker = CascadeReranker(
+            model_loader.lazy(model_loader.load_flashrank_model),
+            top_n=rerank_top_n,
+            batch_size=int(os.environ.get("RERANK_BATCH_SIZE", "16")),
+            max_passage_chars=int(os.environ.get("RERANK_MAX_CHARS", "1000")),
+            latency_budget_ms=budget_ms or None,
+            rerank_weight=float(os.environ.get("RERANK_WEIGHT", "0.5"))
+        )
+    
+    embedding_model = model_loader.lazy(
+        model_loader.create_embedder,
+        backend=os.environ.get("EMBEDDER_BACKEND", "spacy"),
+        threads=int(os.environ.get("EMBEDDER_THREADS", "0")) or None,
+        quantize=os.environ.get("EMBEDDER_QUANTIZE", "1") != "0",
+        cache_entries=int(os.environ.get("EMBEDDING_CACHE_ENTRIES", "50000")),
+        cache_max_bytes=int(os.environ.get("EMBEDDING_CACHE_MB", "0")) * 1024 * 1024 or None,
+        cache_spill_dir=os.environ.get("EMBEDDING_CACHE_SPILL_DIR") or None
+    )
+    domain_vocabularies = model_loader.lazy(model_loader.load_domain_vocabularies)
+    
+    pdf_processor = PDFProcessor()
+    section_cache = None
+    corpus_manifest = None
+    
+    # With CORPUS_MANIFEST_DIR set, the manifest stores sections per document so only changed PDFs are processed
+    manifest_dir = os.environ.get("CORPUS_MANIFEST_DIR", "")
+    if os.environ.get("STREAM_SECTIONS") == "1":
+        manifest_dir = ""
+    
+    # The manifest keeps its embeddings beside its sections unless EMBEDDING_STORE_DIR names a store
+    embedding_store_dir = os.environ.get("EMBEDDING_STORE_DIR", "")
+    if not embedding_store_dir and manifest_dir:
+        embedding_store_dir = os.path.join(manifest_dir, "embeddings")
+    
+    semantic_analyzer = SemanticAnalyzer(
+        nlp_model, embedding_model, domain_vocabularies,
+        embedding_store_dir=embedding_store_dir or None,
+        embedding_store_max_bytes=int(os.environ.get("EMBEDDING_STORE_MAX_MB", "1024")) * 1024 * 1024 or None
+    )
+    relevance_scorer = RelevanceScorer(semantic_analyzer)
+    relevance_scorer.candidate_min_sections = int(os.environ.get("BM25_PREFILTER_MIN_SECTIONS", "5000"))
+    relevance_scorer.ann_min_sections = int(os.environ.get("ANN_MIN_SECTIONS", "200000"))
+    relevance_scorer.ann_shortlist_size = int(os.environ.get("ANN_SHORTLIST", "2000"))
+    relevance_scorer.ann_probes = int(os.environ.get("ANN_PROBES", "8"))
+    subsection_extractor = SubsectionExtractor(semantic_analyzer)
+    output_formatter = OutputFormatter()
+    
+    # First stage keeps enough candidates for the reranker
+    candidate_count = max(7, rerank_top_n)
+    
+    # Extracted sections are reused across runs only when SECTION_CACHE_DIR is set
+    cache_dir = os.environ.get("SECTION_CACHE_DIR", "")
+    if cache_dir and os.environ.get("STREAM_SECTIONS") != "1":
+        cache_max_mb = int(os.environ.get("SECTION_CACHE_MAX_MB", "512"))
+        section_cache = SectionCache(cache_dir, max_bytes=cache_max_mb * 1024 * 1024)
+    
+    if manifest_dir:
+        corpus_manifest = CorpusManifest(manifest_dir)
+    
+    # Worker count: PDF_WORKERS env var, defaults to all available cores
+    max_workers = int(os.environ.get("PDF_WORKERS", "0")) or available_cpu_count()
+    
+    return {
+        'model_loader': model_loader,
+        'embedding_model': embedding_model,
+        'pdf_processor': pdf_processor,
+        'semantic_analyzer': semantic_analyzer,
+        'relevance_scorer': relevance_scorer,
+        'subsection_extractor': subsection_extractor,
+        'output_formatter': output_formatter,
+        'reranker': reranker,
+        'rerank_top_n': rerank_top_n,
+        'candidate_count': candidate_count,
+        'section_cache': section_cache,
+        'corpus_manifest': corpus_manifest,
+        'max_workers': max_workers
+    }
 
 def main():
     """Main pipeline optimized for target accuracy"""
@@ -20,24 +164,51 @@ def main():
     sys.path.insert(0, '/app')
     
     try:
-        # Import optimized modules
-        from model_loader import OfflineModelLoader
-        from pdf_processor import PDFProcessor
-        from semantic_analyzer import SemanticAnalyzer
-        from relevance_scorer import RelevanceScorer
-        from subsection_extractor import SubsectionExtractor
-        from output_formatter import OutputFormatter
+        import instrumentation
         
-        # Load models
-        print("📥 Loading optimized models...")
-        model_loader = OfflineModelLoader()
+        # RUN_REPORT=1 records stage timings and counters into run_report.json
+        if os.environ.get("RUN_REPORT") == "1":
+            instrumentation.enable()
         
-        nlp_model = model_loader.load_spacy_model()
-        flashrank_model = model_loader.load_flashrank_model()
-        embedding_model = model_loader.create_lightweight_embedder()
-        domain_vocabularies = model_loader.load_domain_vocabularies()
+        pipeline = build_pipeline()
+        model_loader = pipeline['model_loader']
+        embedding_model = pipeline['embedding_model']
+        pdf_processor = pipeline['pdf_processor']
+        relevance_scorer = pipeline['relevance_scorer']
+        subsection_extractor = pipeline['subsection_extractor']
+        output_formatter = pipeline['output_formatter']
+        reranker = pipeline['reranker']
+        rerank_top_n = pipeline['rerank_top_n']
+        candidate_count = pipeline['candidate_count']
+        section_cache = pipeline['section_cache']
+        corpus_manifest = pipeline['corpus_manifest']
+        max_workers = pipeline['max_workers']
         
-        print(f"✅ Models loaded in {time.time() - start_time:.1f}s")
+        def opened_embedding_store():
+            # Asking for the store opens it, which needs the embedder; skip runs that never embedded
+            if not embedding_model.is_loaded:
+                return None
+            return pipeline['semantic_analyzer'].embedding_store()
+        
+        # BATCH_QUERIES answers many queries over a single extraction of their documents
+        batch_path = os.environ.get("BATCH_QUERIES")
+        if batch_path:
+            from batch_runner import load_queries, run_batch
+            
+            queries = load_queries(batch_path)
+            print(f"📋 Loaded {len(queries)} batch queries from {batch_path}")
+            output_dir = os.environ.get("BATCH_OUTPUT_DIR", "/app/output/batch")
+            
+            batch_index = run_batch(
+                queries, "/app/input/pdf", output_dir, pdf_processor, relevance_scorer,
+                subsection_extractor, output_formatter, max_workers=max_workers,
+                section_cache=section_cache, reranker=reranker, candidate_count=candidate_count
+            )
+            
+            print_run_summary(start_time, model_loader, embedding_model, section_cache,
+                              str(Path(output_dir) / "run_report.json"),
+                              embedding_store=opened_embedding_store(), queries=len(batch_index))
+            return
         
         # Load configuration
         print("📋 Loading configuration...")
@@ -52,31 +223,75 @@ def main():
         
         print(f"✅ Target: {persona} - {job_description}")
         
-        # Process PDFs with enhanced extraction
-        print("\n📄 Processing PDFs for target output...")
-        pdf_processor = PDFProcessor()
-        all_sections = []
-        
+        pdf_paths = []
         for doc_info in documents:
             pdf_path = f"/app/input/pdf/{doc_info['filename']}"
             
             if Path(pdf_path).exists():
-                print(f"  Processing: {doc_info['filename']}")
-                sections = pdf_processor.extract_document_content(pdf_path)
+                pdf_paths.append(pdf_path)
+        
+        if os.environ.get("STREAM_SECTIONS") == "1":
+            # Stream sections page by page into a bounded top-k heap
+            print("\n📄 Streaming PDFs into target-optimized scoring...")
+            print("⚠️ Streaming scores without BM25, which needs whole-collection statistics, "
+                  "so rankings can differ from the default mode")
+            section_stream = chain.from_iterable(
+                pdf_processor.iter_sections(pdf_path) for pdf_path in pdf_paths
+            )
+            with instrumentation.span("stream_extract_and_score"):
+                scored_sections = relevance_scorer.score_section_stream(
+                    section_stream, persona, job_description, top_k=candidate_count
+                )
+        else:
+            # Process PDFs with enhanced extraction
+            print("\n📄 Processing PDFs for target output...")
+            all_sections = []
+            
+            print(f"  Extracting {len(pdf_paths)} documents with up to {max_workers} workers")
+            
+            section_embeddings = None
+            with instrumentation.span("extract"):
+                if corpus_manifest is not None:
+                    # The manifest stores each document's sections itself; a cache would copy them
+                    section_cache = None
+                    document_sections, section_embeddings = corpus_manifest.sync(
+                        pdf_paths, pdf_processor, pipeline['semantic_analyzer'], max_workers
+                    )
+                    manifest_stats = corpus_manifest.stats()
+                    print(f"  🗂️  Corpus manifest: {manifest_stats['added']} added, "
+                          f"{manifest_stats['modified']} modified, {manifest_stats['unchanged']} unchanged, "
+                          f"{manifest_stats['deleted']} deleted")
+                else:
+                    document_sections = pdf_processor.extract_documents(
+                        pdf_paths, max_workers, cache=section_cache
+                    )
+            
+            for pdf_path, sections in zip(pdf_paths, document_sections):
+                print(f"  Processed: {Path(pdf_path).name}")
                 all_sections.extend(sections)
                 print(f"    ✅ Extracted {len(sections)} quality sections")
+            
+            print(f"✅ Total sections: {len(all_sections)}")
+            
+            # Enhanced semantic analysis and scoring
+            print("\n🧠 Performing target-optimized analysis...")
+            features = None
+            if section_embeddings is not None and all_sections:
+                # A single query never repays building the ANN index; the shortlist scans exactly
+                features = relevance_scorer.build_corpus_features(all_sections, section_embeddings,
+                                                                  build_ann=False)
+            with instrumentation.span("score"):
+                scored_sections = relevance_scorer.score_all_sections(
+                    all_sections, persona, job_description, top_k=candidate_count, features=features
+                )
         
-        print(f"✅ Total sections: {len(all_sections)}")
-        
-        # Enhanced semantic analysis and scoring
-        print("\n🧠 Performing target-optimized analysis...")
-        semantic_analyzer = SemanticAnalyzer(nlp_model, embedding_model, domain_vocabularies)
-        relevance_scorer = RelevanceScorer(semantic_analyzer)
-        
-        # Score sections for target output
-        scored_sections = relevance_scorer.score_all_sections(
-            all_sections, persona, job_description
-        )
+        if reranker is not None:
+            print(f"\n🔁 Reranking top {rerank_top_n} sections with FlashRank...")
+            with instrumentation.span("rerank"):
+                scored_sections = reranker.rerank(scored_sections, f"{persona}: {job_description}")
+            rerank_stats = reranker.last_stats
+            print(f"✅ Reranked {rerank_stats['reranked']} of {rerank_stats['candidates']} candidates "
+                  f"in {rerank_stats['batches']} batches ({rerank_stats['elapsed_ms']:.0f}ms)")
         
         # Get top sections
         top_sections = relevance_scorer.get_top_sections_for_target_output(
@@ -85,34 +300,32 @@ def main():
         
         # Extract refined subsections
         print("\n📝 Extracting target-quality subsections...")
-        subsection_extractor = SubsectionExtractor(semantic_analyzer)
-        
-        refined_subsections = subsection_extractor.extract_refined_subsections(
-            top_sections, persona, job_description
-        )
+        with instrumentation.span("subsections"):
+            refined_subsections = subsection_extractor.extract_refined_subsections(
+                top_sections, persona, job_description
+            )
         
         # Format final output
         print("\n💾 Generating target output...")
-        output_formatter = OutputFormatter()
-        
-        final_output = output_formatter.format_final_output(
-            challenge_config, top_sections, refined_subsections
-        )
         
         # Save results
         output_path = "/app/output/results.json"
         Path("/app/output").mkdir(exist_ok=True)
         
-        success = output_formatter.save_results(final_output, output_path)
+        with instrumentation.span("format_output"):
+            final_output = output_formatter.format_final_output(
+                challenge_config, top_sections, refined_subsections
+            )
+            success = output_formatter.save_results(final_output, output_path)
         
         if success:
             output_formatter.print_target_summary(final_output)
         
-        # Final metrics
-        total_time = time.time() - start_time
-        print(f"\n⏱️  Processing time: {total_time:.1f}s")
-        print("🎯 Target output optimization completed!")
-        
+        print_run_summary(start_time, model_loader, embedding_model, section_cache,
+                          str(Path(output_path).with_name("run_report.json")),
+                          embedding_store=opened_embedding_store(), documents=len(pdf_paths),
+                          corpus_manifest=corpus_manifest.stats() if corpus_manifest is not None else None)
+    
     except Exception as e:
         print(f"\n❌ Error: {e}")
         import traceback
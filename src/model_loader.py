@@ -3,45 +3,259 @@ Lightweight Model Loader - No Heavy Dependencies
 """
 
 import os
+import time
 import pickle
-import spacy
+import hashlib
+import resource
+import tempfile
+import threading
+import functools
 import numpy as np
 import re
 from pathlib import Path
-from flashrank import Ranker
-from collections import Counter
-from typing import List, Dict, Any
+from collections import Counter, OrderedDict
+from typing import List, Dict, Any, Tuple
+from top_k import top_k_indices
+import instrumentation
+
+# Process-wide model registry: each model is loaded once and shared by reference
+_MODEL_REGISTRY = {}
+_MODEL_LOAD_STATS = {}
+_REGISTRY_LOCK = threading.RLock()
+
+# Loads in progress, outermost first, each with the [seconds, bytes] its nested loads took
+_LOAD_STACK = []
+
+def _current_rss_bytes() -> int:
+    """Resident set size of this process in bytes"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # Peak RSS (KB on Linux) is the best portable approximation
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+# spaCy components each task needs; everything else is skipped for that task
+PIPELINE_PROFILES = {
+    "full": ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "ner"],
+    "embed": ["tok2vec"],           # Token tensors for LightweightEmbedder
+    "sentences": ["senter"],        # Sentence boundaries without the parser
+}
+
+class LazyModel:
+    """Handle that loads its model on first use
+    
+    Attribute access and calls are forwarded to the loaded model, so the
+    handle can be passed wherever the model itself is expected. loaded_at
+    (epoch seconds) and load_seconds record when the load happened and
+    how long it took.
+    """
+    
+    def __init__(self, name: str, load_fn):
+        self._name = name
+        self._load_fn = load_fn
+        self._model = None
+        self._lock = threading.Lock()
+        self.loaded_at = None
+        self.load_seconds = None
+    
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None
+    
+    def resolve(self):
+        """The underlying model, loading it if needed"""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    start_time = time.perf_counter()
+                    model = self._load_fn()
+                    self.load_seconds = time.perf_counter() - start_time
+                    self.loaded_at = time.time()
+                    self._model = model
+        return self._model
+    
+    def __getattr__(self, attr):
+        # Internals never trigger a load (this also keeps copy/pickle probes safe)
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        return getattr(self.resolve(), attr)
+    
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+    
+    # Container protocol for dict-like models such as the vocabularies
+    def __getitem__(self, key):
+        return self.resolve()[key]
+    
+    def __contains__(self, key):
+        return key in self.resolve()
+    
+    def __iter__(self):
+        return iter(self.resolve())
+    
+    def __len__(self):
+        return len(self.resolve())
+    
+    def __repr__(self):
+        state = f"loaded in {self.load_seconds:.2f}s" if self.is_loaded else "not loaded"
+        return f"<LazyModel {self._name}: {state}>"
 
 class OfflineModelLoader:
-    def __init__(self):
-        self.project_root = Path("/app")
+    def __init__(self, project_root: str = "/app"):
+        self.project_root = Path(project_root)
         self.models_dir = self.project_root / "models"
         self.setup_offline_environment()
-        
+    
     def setup_offline_environment(self):
         """Configure environment for offline execution"""
         os.environ['HF_HUB_OFFLINE'] = '1'
         os.environ['FLASHRANK_CACHE_DIR'] = str(self.models_dir / "flashrank")
+    
+    def _get_or_load(self, name: str, load_fn):
+        """Return the registered model, loading and measuring it on first request
         
+        Stats are exclusive: a load that triggers nested registry loads
+        (e.g. an embedder loading spaCy) is charged only for its own time
+        and memory, so every cost is counted once.
+        """
+        with _REGISTRY_LOCK:
+            if name not in _MODEL_REGISTRY:
+                rss_before = _current_rss_bytes()
+                start_time = time.perf_counter()
+                nested = [0.0, 0]
+                _LOAD_STACK.append(nested)
+                
+                try:
+                    with instrumentation.span(f"model_load:{name}"):
+                        model = load_fn()
+                finally:
+                    _LOAD_STACK.pop()
+                
+                seconds = time.perf_counter() - start_time
+                memory_bytes = _current_rss_bytes() - rss_before
+                if _LOAD_STACK:
+                    _LOAD_STACK[-1][0] += seconds
+                    _LOAD_STACK[-1][1] += memory_bytes
+                
+                _MODEL_LOAD_STATS[name] = {
+                    'load_seconds': seconds - nested[0],
+                    'memory_delta_mb': (memory_bytes - nested[1]) / (1024 * 1024)
+                }
+                _MODEL_REGISTRY[name] = model
+            
+            return _MODEL_REGISTRY[name]
+    
+    def lazy(self, load_fn, *args, **kwargs) -> LazyModel:
+        """Handle that calls load_fn(*args, **kwargs) on first use
+        
+        load_fn is one of the load_*/create_* methods, so the model still
+        lands in the shared registry when it is finally loaded.
+        """
+        name = "/".join([load_fn.__name__] + [str(arg) for arg in args])
+        return LazyModel(name, functools.partial(load_fn, *args, **kwargs))
+    
+    def get_model_stats(self) -> Dict[str, Dict[str, float]]:
+        """Load time and memory delta of every model loaded in this process"""
+        with _REGISTRY_LOCK:
+            return {name: dict(stats) for name, stats in _MODEL_LOAD_STATS.items()}
+    
+    def print_model_report(self):
+        """Print load time and memory cost per model"""
+        for name, stats in self.get_model_stats().items():
+            print(f"  {name}: {stats['load_seconds']:.2f}s, "
+                  f"{stats['memory_delta_mb']:+.1f} MB")
+    
     def load_spacy_model(self):
-        """Load spaCy model"""
+        """Load spaCy model (shared)"""
+        return self._get_or_load("spacy", self._load_spacy_model)
+    
+    def _load_spacy_model(self):
+        """Deserialize spaCy model from local storage"""
+        import spacy
+        
         try:
             local_model_path = str(self.models_dir / "spacy" / "en_core_web_sm")
             return spacy.load(local_model_path)
         except:
             return spacy.load("en_core_web_sm")
     
+    def load_spacy_pipeline(self, profile: str = "full"):
+        """Get a named, trimmed view of the shared spaCy model"""
+        if profile not in PIPELINE_PROFILES:
+            raise ValueError(f"Unknown spaCy pipeline profile: {profile}")
+        
+        return self._get_or_load(
+            f"spacy:{profile}",
+            lambda: PipelineProfile(self.load_spacy_model(), profile, PIPELINE_PROFILES[profile])
+        )
+    
     def load_flashrank_model(self):
-        """Load FlashRank model"""
+        """Load FlashRank model (shared)"""
+        return self._get_or_load("flashrank", self._load_flashrank_model)
+    
+    def _load_flashrank_model(self):
+        """Create FlashRank ranker from local cache"""
+        from flashrank import Ranker
+        
         cache_dir = str(self.models_dir / "flashrank")
         return Ranker(model_name="ms-marco-MiniLM-L-12-v2", cache_dir=cache_dir)
     
-    def create_lightweight_embedder(self):
-        """Create lightweight embedding system"""
-        return LightweightEmbedder(self.load_spacy_model())
+    def create_lightweight_embedder(self, cache_entries: int = 50000, cache_max_bytes: int = None,
+                                    cache_spill_dir: str = None):
+        """Create lightweight embedding system on the shared spaCy model
+        
+        The cache settings apply to the first call; later calls get the
+        registered embedder. cache_entries=0 disables the embedding cache.
+        """
+        def create():
+            cache = None
+            if cache_entries:
+                cache = EmbeddingCache(cache_entries, cache_max_bytes, cache_spill_dir)
+            return LightweightEmbedder(self.load_spacy_pipeline("embed"), cache)
+        
+        return self._get_or_load("lightweight_embedder", create)
+    
+    def create_embedder(self, backend: str = "spacy", threads: int = None, quantize: bool = True,
+                        cache_entries: int = 50000, cache_max_bytes: int = None, cache_spill_dir: str = None):
+        """Create the embedder for a backend: "spacy" or "minilm-onnx"
+        
+        "minilm-onnx" runs the bundled all-MiniLM-L6-v2 snapshot on
+        onnxruntime (int8 unless quantize=False, threads intra-op threads).
+        If the snapshot or onnxruntime is unavailable, the spaCy embedder
+        is returned instead.
+        """
+        if backend == "spacy":
+            return self.create_lightweight_embedder(cache_entries, cache_max_bytes, cache_spill_dir)
+        if backend != "minilm-onnx":
+            raise ValueError(f"Unknown embedder backend: {backend}")
+        
+        def create():
+            from onnx_embedder import OnnxMiniLMEmbedder
+            
+            cache = None
+            if cache_entries:
+                cache = EmbeddingCache(cache_entries, cache_max_bytes, cache_spill_dir)
+            return OnnxMiniLMEmbedder(self.minilm_snapshot_dir(), threads, quantize, cache)
+        
+        try:
+            return self._get_or_load("minilm_onnx_embedder", create)
+        except Exception as e:
+            print(f"⚠️ MiniLM ONNX embedder unavailable ({e}), using spaCy embedder")
+            return self.create_lightweight_embedder(cache_entries, cache_max_bytes, cache_spill_dir)
+    
+    def minilm_snapshot_dir(self) -> Path:
+        """Snapshot folder of the bundled all-MiniLM-L6-v2 model"""
+        repo_dir = self.models_dir / "sentence_transformers" / "models--sentence-transformers--all-MiniLM-L6-v2"
+        revision = (repo_dir / "refs" / "main").read_text().strip()
+        return repo_dir / "snapshots" / revision
     
     def load_domain_vocabularies(self):
-        """Load domain vocabularies"""
+        """Load domain vocabularies (shared)"""
+        return self._get_or_load("domain_vocabularies", self._load_domain_vocabularies)
+    
+    def _load_domain_vocabularies(self):
+        """Unpickle domain vocabularies"""
         vocab_path = self.models_dir / "vocabularies" / "domain_keywords.pkl"
         try:
             with open(vocab_path, "rb") as f:
@@ -60,19 +274,223 @@ class OfflineModelLoader:
             }
         }
 
+class PipelineProfile:
+    """Runs only selected components of a shared spaCy model
+    
+    Components are fetched by name, so components disabled in the packaged
+    pipeline (such as senter) can be used without mutating the shared model.
+    """
+    
+    def __init__(self, nlp_model, name: str, components: List[str]):
+        self.nlp = nlp_model
+        self.name = name
+        self.components = [nlp_model.get_pipe(component) for component in components]
+    
+    def __call__(self, text: str):
+        """Process one text through the profile's components"""
+        doc = self._make_doc(text)
+        for component in self.components:
+            doc = component(doc)
+        return doc
+    
+    def pipe(self, texts, batch_size: int = 64):
+        """Stream texts through the profile's components in batches"""
+        docs = (self._make_doc(text) for text in texts)
+        for component in self.components:
+            if hasattr(component, "pipe"):
+                docs = component.pipe(docs, batch_size=batch_size)
+            else:
+                docs = map(component, docs)
+        return docs
+    
+    def _make_doc(self, text: str):
+        instrumentation.count('spacy_docs')
+        return self.nlp.make_doc(text)
+
+class EmbeddingCache:
+    """Bounded LRU memo of text embeddings with optional on-disk spill
+    
+    Entries are evicted least recently used first once either the entry
+    or the byte limit is exceeded. With a spill directory, evicted vectors
+    are written to disk and loaded back on a later miss.
+    """
+    
+    def __init__(self, max_entries: int = 50000, max_bytes: int = None, spill_dir: str = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        if self.spill_dir:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+        
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.spill_hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def make_key(text: str) -> str:
+        """Compact hash key for a text"""
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+    
+    def get(self, key: str):
+        """Cached vector for key, or None"""
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector
+        
+        if self.spill_dir:
+            try:
+                vector = np.load(self.spill_dir / f"{key}.npy")
+            except (OSError, ValueError):
+                vector = None
+            if vector is not None:
+                vector = self.put(key, vector)
+                with self._lock:
+                    self.hits += 1
+                    self.spill_hits += 1
+                return vector
+        
+        with self._lock:
+            self.misses += 1
+        return None
+    
+    def put(self, key: str, vector: np.ndarray) -> np.ndarray:
+        """Store a vector, evicting least recently used entries as needed"""
+        vector = np.array(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        evicted = []
+        
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._entries[key] = vector
+            self._bytes += vector.nbytes
+            
+            while self._entries and (
+                len(self._entries) > self.max_entries or
+                (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                old_key, old_vector = self._entries.popitem(last=False)
+                self._bytes -= old_vector.nbytes
+                self.evictions += 1
+                evicted.append((old_key, old_vector))
+        
+        if self.spill_dir:
+            for old_key, old_vector in evicted:
+                self._spill(old_key, old_vector)
+        
+        return vector
+    
+    def _spill(self, key: str, vector: np.ndarray):
+        """Write an evicted vector to disk via atomic rename"""
+        path = self.spill_dir / f"{key}.npy"
+        if path.exists():
+            return
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.spill_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, vector)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit-rate statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'spill_hits': self.spill_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
 class LightweightEmbedder:
     """Lightweight semantic embedding using only spaCy and basic math"""
     
-    def __init__(self, nlp_model):
+    name = "spacy-tok2vec"
+    
+    def __init__(self, nlp_model, cache: EmbeddingCache = None):
         self.nlp = nlp_model
-        
+        self.cache = cache
+        self.dimension = 96  # en_core_web_sm tok2vec width
+    
+    def _cache_key(self, text: str) -> str:
+        """Key for the exact (truncated) text spaCy sees"""
+        return EmbeddingCache.make_key(f"{self.name}\0{text}")
+    
     def encode(self, text):
         """Create embeddings using spaCy word vectors"""
         if not text or not text.strip():
-            return np.zeros(96)
-            
-        doc = self.nlp(text[:500])
+            return np.zeros(self.dimension)
+        
+        text = text[:500]
+        if self.cache is not None:
+            key = self._cache_key(text)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        
+        instrumentation.count('texts_embedded')
+        instrumentation.count('characters_embedded', len(text))
+        doc = self.nlp(text)
+        
+        vector = self._doc_vector(doc)
+        if vector is None:
+            vector = np.zeros(self.dimension)
+        
+        if self.cache is not None:
+            self.cache.put(key, vector)
+        return vector
+    
+    def encode_batch(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        """Embed many texts with nlp.pipe into a contiguous float32 matrix
         
+        Row i holds the embedding of texts[i]; texts without usable tokens
+        get a zero row, exactly as encode() would return. Cached texts and
+        duplicates within the batch are only embedded once.
+        """
+        matrix = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        
+        # Group rows by the truncated text so each distinct text is embedded once
+        pending = {}
+        for i, text in enumerate(texts):
+            if text and text.strip():
+                pending.setdefault(text[:500], []).append(i)
+        
+        if self.cache is not None:
+            for text in list(pending):
+                cached = self.cache.get(self._cache_key(text))
+                if cached is not None:
+                    matrix[pending.pop(text)] = cached
+        
+        instrumentation.count('texts_embedded', len(pending))
+        instrumentation.count('characters_embedded', sum(len(text) for text in pending))
+        docs = self.nlp.pipe(pending.keys(), batch_size=batch_size)
+        
+        for (text, rows), doc in zip(pending.items(), docs):
+            vector = self._doc_vector(doc)
+            if vector is None:
+                vector = np.zeros(self.dimension, dtype=np.float32)
+            matrix[rows] = vector
+            if self.cache is not None:
+                self.cache.put(self._cache_key(text), vector)
+        
+        return matrix
+    
+    def _doc_vector(self, doc):
+        """Mean vector of content tokens, or None if there are none"""
         vectors = []
         for token in doc:
             if (token.has_vector and not token.is_stop and 
@@ -81,14 +499,15 @@ class LightweightEmbedder:
         
         if vectors:
             return np.mean(vectors, axis=0)
-        else:
-            return np.zeros(96)
+        return None
     
     def similarity(self, text1, text2):
         """Calculate similarity between two texts"""
-        vec1 = self.encode(text1)
-        vec2 = self.encode(text2)
-        
+        return self.cosine(self.encode(text1), self.encode(text2))
+    
+    @staticmethod
+    def cosine(vec1, vec2):
+        """Cosine similarity between two embedding vectors"""
         dot_product = np.dot(vec1, vec2)
         norm1 = np.linalg.norm(vec1)
         norm2 = np.linalg.norm(vec2)
@@ -98,48 +517,96 @@ class LightweightEmbedder:
         
         return float(dot_product / (norm1 * norm2))
 
+class SparseMatrix:
+    """Minimal CSR matrix: row i lives in data/indices[indptr[i]:indptr[i + 1]]"""
+    
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray, shape: Tuple[int, int]):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.shape = shape
+    
+    def row_ids(self) -> np.ndarray:
+        """Row index of every stored value"""
+        return np.repeat(np.arange(self.shape[0]), np.diff(self.indptr))
+    
+    def row_norms(self) -> np.ndarray:
+        """L2 norm of every row"""
+        squared = np.bincount(self.row_ids(), weights=self.data ** 2, minlength=self.shape[0])
+        return np.sqrt(squared)
+    
+    def dot(self, vector: np.ndarray) -> np.ndarray:
+        """Matrix-vector product with a dense vector"""
+        return np.bincount(self.row_ids(), weights=self.data * vector[self.indices],
+                           minlength=self.shape[0])
+    
+    def getrow(self, i: int) -> np.ndarray:
+        """Dense copy of one row"""
+        row = np.zeros(self.shape[1])
+        start, end = self.indptr[i], self.indptr[i + 1]
+        row[self.indices[start:end]] = self.data[start:end]
+        return row
+    
+    def toarray(self) -> np.ndarray:
+        """Dense copy of the whole matrix"""
+        dense = np.zeros(self.shape)
+        dense[self.row_ids(), self.indices] = self.data
+        return dense
+
 class SimpleTFIDF:
-    """Simple TF-IDF implementation without scikit-learn"""
+    """Simple TF-IDF implementation without scikit-learn
+    
+    Each document is tokenized once; document frequencies are counted in
+    the same pass and matrices come back in CSR form (SparseMatrix).
+    """
     
     def __init__(self, max_features=1000):
         self.max_features = max_features
         self.vocabulary = {}
         self.idf_values = {}
+        self._idf = np.zeros(0)
     
-    def fit_transform(self, documents):
-        """Fit TF-IDF on documents and return matrix"""
-        # Build vocabulary
-        all_words = []
-        for doc in documents:
-            words = self._tokenize(doc)
-            all_words.extend(words)
+    def fit_transform(self, documents) -> SparseMatrix:
+        """Fit TF-IDF on documents and return sparse matrix"""
+        tokenized = [self._tokenize(doc) for doc in documents]
+        
+        # Term and document frequencies in one pass
+        word_counts = Counter()
+        doc_freq = Counter()
+        for words in tokenized:
+            word_counts.update(words)
+            doc_freq.update(set(words))
         
-        word_counts = Counter(all_words)
         # Keep most common words up to max_features
         self.vocabulary = {word: i for i, (word, _) in 
                           enumerate(word_counts.most_common(self.max_features))}
         
         # Calculate IDF values
         doc_count = len(documents)
-        for word in self.vocabulary:
-            containing_docs = sum(1 for doc in documents if word in self._tokenize(doc))
-            self.idf_values[word] = np.log(doc_count / (containing_docs + 1))
+        self._idf = np.array([np.log(doc_count / (doc_freq[word] + 1)) for word in self.vocabulary])
+        self.idf_values = dict(zip(self.vocabulary, self._idf.tolist()))
         
-        # Create TF-IDF matrix
-        matrix = []
-        for doc in documents:
-            vector = self._document_to_vector(doc)
-            matrix.append(vector)
-        
-        return np.array(matrix)
+        return self._build_matrix(tokenized)
     
-    def transform(self, documents):
+    def transform(self, documents) -> SparseMatrix:
         """Transform documents using fitted vocabulary"""
-        matrix = []
-        for doc in documents:
-            vector = self._document_to_vector(doc)
-            matrix.append(vector)
-        return np.array(matrix)
+        return self._build_matrix([self._tokenize(doc) for doc in documents])
+    
+    def cosine_top_k(self, matrix: SparseMatrix, query: str, k: int = 10) -> List[Tuple[int, float]]:
+        """Top-k rows of matrix by cosine similarity to a query text
+        
+        Returns (row, similarity) pairs, best first; ties go to the lower row.
+        """
+        query_vector = self.transform([query]).getrow(0)
+        query_norm = np.linalg.norm(query_vector)
+        if query_norm == 0 or matrix.shape[0] == 0:
+            return []
+        
+        norms = matrix.row_norms()
+        dots = matrix.dot(query_vector)
+        similarities = np.divide(dots, norms * query_norm, out=np.zeros_like(dots), where=norms > 0)
+        
+        return [(int(row), float(similarities[row])) for row in top_k_indices(similarities, k)]
     
     def _tokenize(self, text):
         """Simple tokenization"""
@@ -147,25 +614,29 @@ class SimpleTFIDF:
         words = re.findall(r'\b[a-z]{2,}\b', text)
         return words
     
-    def _document_to_vector(self, document):
-        """Convert document to TF-IDF vector"""
-        words = self._tokenize(document)
-        word_count = len(words)
-        
-        vector = np.zeros(len(self.vocabulary))
+    def _build_matrix(self, tokenized: List[List[str]]) -> SparseMatrix:
+        """Convert tokenized documents to a CSR TF-IDF matrix"""
+        indptr = [0]
+        indices = []
+        data = []
         
-        if word_count == 0:
-            return vector
+        for words in tokenized:
+            word_count = len(words)
+            row = sorted(
+                (self.vocabulary[word], freq) for word, freq in Counter(words).items()
+                if word in self.vocabulary
+            )
+            for column, freq in row:
+                indices.append(column)
+                data.append(freq / word_count * self._idf[column])
+            indptr.append(len(indices))
         
-        word_freq = Counter(words)
-        
-        for word, freq in word_freq.items():
-            if word in self.vocabulary:
-                tf = freq / word_count
-                idf = self.idf_values.get(word, 0)
-                vector[self.vocabulary[word]] = tf * idf
-        
-        return vector
+        return SparseMatrix(
+            np.array(indptr, dtype=np.int64),
+            np.array(indices, dtype=np.int32),
+            np.array(data, dtype=np.float64),
+            (len(tokenized), len(self.vocabulary))
+        )
 
 def cosine_similarity_simple(a, b):
     """Simple cosine similarity calculation"""
@@ -0,0 +1,348 @@
+"""
+ONNX MiniLM Embedder - Sentence Embeddings on onnxruntime without PyTorch
+"""
+
+import json
+import struct
+import numpy as np
+from pathlib import Path
+from typing import List, Dict
+
+from model_loader import EmbeddingCache
+import instrumentation
+
+# ONNX TensorProto element types
+_FLOAT = 1
+_INT8 = 3
+_INT64 = 7
+
+_SAFETENSORS_DTYPES = {'F32': np.float32, 'F16': np.float16, 'I64': np.int64, 'I32': np.int32}
+
+def read_safetensors(path: str) -> Dict[str, np.ndarray]:
+    """Load every tensor of a .safetensors file as a NumPy array"""
+    with open(path, 'rb') as f:
+        header_size = struct.unpack('<Q', f.read(8))[0]
+        header = json.loads(f.read(header_size))
+        buffer = f.read()
+    
+    tensors = {}
+    for name, info in header.items():
+        if name == '__metadata__':
+            continue
+        start, end = info['data_offsets']
+        dtype = _SAFETENSORS_DTYPES[info['dtype']]
+        tensors[name] = np.frombuffer(buffer[start:end], dtype=dtype).reshape(info['shape'])
+    return tensors
+
+# Minimal protobuf writer for the handful of ONNX messages the graph needs
+
+def _varint(value: int) -> bytes:
+    value &= (1 << 64) - 1  # Negative int64 fields use two's complement
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+def _field_int(field: int, value: int) -> bytes:
+    return _varint(field << 3) + _varint(value)
+
+def _field_bytes(field: int, data: bytes) -> bytes:
+    return _varint(field << 3 | 2) + _varint(len(data)) + data
+
+def _field_str(field: int, text: str) -> bytes:
+    return _field_bytes(field, text.encode('utf-8'))
+
+def _field_float(field: int, value: float) -> bytes:
+    return _varint(field << 3 | 5) + struct.pack('<f', value)
+
+class OnnxGraph:
+    """Accumulates nodes and initializers and serializes an ONNX ModelProto"""
+    
+    OPSET = 17
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.nodes = []
+        self.initializers = []
+        self.inputs = []
+        self.outputs = []
+        self._counter = 0
+    
+    def _unique(self, prefix: str) -> str:
+        self._counter += 1
+        return f"{prefix}_{self._counter}"
+    
+    def constant(self, array: np.ndarray, name: str = None) -> str:
+        """Add an initializer tensor and return its name"""
+        array = np.ascontiguousarray(array)
+        data_type = {np.dtype(np.float32): _FLOAT, np.dtype(np.int8): _INT8,
+                     np.dtype(np.int64): _INT64}[array.dtype]
+        name = name or self._unique("const")
+        
+        tensor = b''.join(_field_int(1, dim) for dim in array.shape)
+        tensor += _field_int(2, data_type) + _field_str(8, name) + _field_bytes(9, array.tobytes())
+        self.initializers.append(tensor)
+        return name
+    
+    def node(self, op_type: str, inputs: List[str], domain: str = '', **attributes) -> str:
+        """Add a single-output node and return its output name"""
+        output = self._unique(op_type.lower())
+        
+        proto = b''.join(_field_str(1, name) for name in inputs)
+        proto += _field_str(2, output) + _field_str(3, output) + _field_str(4, op_type)
+        for key, value in attributes.items():
+            if isinstance(value, float):
+                attribute = _field_str(1, key) + _field_float(2, value) + _field_int(20, 1)
+            elif isinstance(value, int):
+                attribute = _field_str(1, key) + _field_int(3, value) + _field_int(20, 2)
+            else:
+                attribute = _field_str(1, key) + b''.join(_field_int(8, v) for v in value) + _field_int(20, 7)
+            proto += _field_bytes(5, attribute)
+        if domain:
+            proto += _field_str(7, domain)
+        
+        self.nodes.append(proto)
+        return output
+    
+    def add_input(self, name: str, elem_type: int, dims: List):
+        """Declare a graph input; string dims are symbolic"""
+        self.inputs.append(self._value_info(name, elem_type, dims))
+    
+    def add_output(self, name: str, elem_type: int, dims: List):
+        """Declare a graph output; string dims are symbolic"""
+        self.outputs.append(self._value_info(name, elem_type, dims))
+    
+    @staticmethod
+    def _value_info(name: str, elem_type: int, dims: List) -> bytes:
+        shape = b''.join(
+            _field_bytes(1, _field_str(2, dim) if isinstance(dim, str) else _field_int(1, dim))
+            for dim in dims
+        )
+        tensor_type = _field_int(1, elem_type) + _field_bytes(2, shape)
+        return _field_str(1, name) + _field_bytes(2, _field_bytes(1, tensor_type))
+    
+    def serialize(self) -> bytes:
+        """ModelProto bytes, ready for onnxruntime.InferenceSession"""
+        graph = b''.join(_field_bytes(1, node) for node in self.nodes)
+        graph += _field_str(2, self.name)
+        graph += b''.join(_field_bytes(5, tensor) for tensor in self.initializers)
+        graph += b''.join(_field_bytes(11, value) for value in self.inputs)
+        graph += b''.join(_field_bytes(12, value) for value in self.outputs)
+        
+        model = _field_int(1, 8)  # IR version 8 pairs with opset 17
+        model += _field_str(2, "challenge-1b")
+        model += _field_bytes(7, graph)
+        model += _field_bytes(8, _field_int(2, self.OPSET))
+        model += _field_bytes(8, _field_str(1, "com.microsoft") + _field_int(2, 1))
+        return model
+
+def build_bert_encoder(weights: Dict[str, np.ndarray], config: Dict, quantize: bool = True) -> bytes:
+    """ONNX graph of a BERT encoder with masked mean pooling
+    
+    Inputs are input_ids and attention_mask (int64, [batch, seq]); the
+    output is the unnormalized mean of the last hidden states over the
+    unmasked tokens. With quantize, every dense layer runs as a dynamic
+    int8 DynamicQuantizeMatMul with per-column weight scales, the layout
+    onnxruntime's own dynamic quantization produces.
+    """
+    hidden = config['hidden_size']
+    heads = config['num_attention_heads']
+    head_dim = hidden // heads
+    eps = float(config.get('layer_norm_eps', 1e-12))
+    
+    g = OnnxGraph("bert_mean_pooling")
+    g.add_input("input_ids", _INT64, ["batch", "sequence"])
+    g.add_input("attention_mask", _INT64, ["batch", "sequence"])
+    
+    def w(name):
+        return g.constant(np.asarray(weights[name], dtype=np.float32))
+    
+    def dense(x, prefix):
+        # torch Linear stores [out, in]; MatMul wants [in, out]
+        matrix = np.asarray(weights[f"{prefix}.weight"], dtype=np.float32).T
+        bias = w(f"{prefix}.bias")
+        if not quantize:
+            return g.node("Add", [g.node("MatMul", [x, g.constant(matrix)]), bias])
+        
+        scale = np.maximum(np.abs(matrix).max(axis=0), 1e-8) / 127.0
+        quantized = np.clip(np.round(matrix / scale), -127, 127).astype(np.int8)
+        return g.node("DynamicQuantizeMatMul", [
+            x, g.constant(quantized), g.constant(scale.astype(np.float32)),
+            g.constant(np.zeros(len(scale), dtype=np.int8)), bias
+        ], domain="com.microsoft")
+    
+    def layer_norm(x, prefix):
+        return g.node("LayerNormalization", [x, w(f"{prefix}.weight"), w(f"{prefix}.bias")], axis=-1, epsilon=eps)
+    
+    # Embeddings: token type is always 0, so its row folds into the position table
+    positions = (weights['embeddings.position_embeddings.weight'] +
+                 weights['embeddings.token_type_embeddings.weight'][0]).astype(np.float32)
+    sequence_length = g.node("Shape", ["input_ids"], start=1, end=2)
+    position_rows = g.node("Slice", [
+        g.constant(positions), g.constant(np.array([0], dtype=np.int64)), sequence_length,
+        g.constant(np.array([0], dtype=np.int64))
+    ])
+    tokens = g.node("Gather", [w('embeddings.word_embeddings.weight'), "input_ids"])
+    x = layer_norm(g.node("Add", [tokens, position_rows]), 'embeddings.LayerNorm')
+    
+    # Additive attention mask: 0 for tokens, -10000 for padding, [batch, 1, 1, seq]
+    mask = g.node("Cast", ["attention_mask"], to=_FLOAT)
+    inverted = g.node("Sub", [g.constant(np.array(1.0, dtype=np.float32)), mask])
+    additive = g.node("Mul", [inverted, g.constant(np.array(-10000.0, dtype=np.float32))])
+    additive = g.node("Unsqueeze", [additive, g.constant(np.array([1, 2], dtype=np.int64))])
+    
+    split_heads = g.constant(np.array([0, 0, heads, head_dim], dtype=np.int64))
+    merge_heads = g.constant(np.array([0, 0, hidden], dtype=np.int64))
+    attention_scale = g.constant(np.array(1.0 / np.sqrt(head_dim), dtype=np.float32))
+    
+    for layer in range(config['num_hidden_layers']):
+        prefix = f"encoder.layer.{layer}"
+        
+        q = g.node("Transpose", [g.node("Reshape", [dense(x, f"{prefix}.attention.self.query"), split_heads])],
+                   perm=[0, 2, 1, 3])
+        k = g.node("Transpose", [g.node("Reshape", [dense(x, f"{prefix}.attention.self.key"), split_heads])],
+                   perm=[0, 2, 3, 1])
+        v = g.node("Transpose", [g.node("Reshape", [dense(x, f"{prefix}.attention.self.value"), split_heads])],
+                   perm=[0, 2, 1, 3])
+        
+        scores = g.node("Add", [g.node("Mul", [g.node("MatMul", [q, k]), attention_scale]), additive])
+        context = g.node("MatMul", [g.node("Softmax", [scores], axis=-1), v])
+        context = g.node("Reshape", [g.node("Transpose", [context], perm=[0, 2, 1, 3]), merge_heads])
+        
+        attention = dense(context, f"{prefix}.attention.output.dense")
+        x = layer_norm(g.node("Add", [attention, x]), f"{prefix}.attention.output.LayerNorm")
+        
+        # Exact GELU: 0.5 * h * (1 + erf(h / sqrt(2)))
+        h = dense(x, f"{prefix}.intermediate.dense")
+        erf = g.node("Erf", [g.node("Div", [h, g.constant(np.array(np.sqrt(2.0), dtype=np.float32))])])
+        gelu = g.node("Mul", [g.node("Mul", [h, g.node("Add", [erf, g.constant(np.array(1.0, dtype=np.float32))])]),
+                              g.constant(np.array(0.5, dtype=np.float32))])
+        
+        output = dense(gelu, f"{prefix}.output.dense")
+        x = layer_norm(g.node("Add", [output, x]), f"{prefix}.output.LayerNorm")
+    
+    # Mean over unmasked tokens
+    token_mask = g.node("Unsqueeze", [mask, g.constant(np.array([2], dtype=np.int64))])
+    summed = g.node("ReduceSum", [g.node("Mul", [x, token_mask]), g.constant(np.array([1], dtype=np.int64))],
+                    keepdims=0)
+    counts = g.node("ReduceSum", [mask, g.constant(np.array([1], dtype=np.int64))], keepdims=1)
+    counts = g.node("Max", [counts, g.constant(np.array(1e-9, dtype=np.float32))])
+    pooled = g.node("Div", [summed, counts])
+    
+    g.add_output(pooled, _FLOAT, ["batch", hidden])
+    return g.serialize()
+
+class OnnxMiniLMEmbedder:
+    """all-MiniLM-L6-v2 sentence embeddings on onnxruntime
+    
+    The ONNX graph is built in memory from the snapshot's safetensors
+    weights (no PyTorch export step), optionally with int8 dynamic
+    quantization of the dense layers. Texts are tokenized in batches with
+    the snapshot's fast tokenizer and grouped by length so padding stays
+    small. Embeddings are L2-normalized, as sentence-transformers does.
+    """
+    
+    name = "minilm-l6-onnx"
+    
+    def __init__(self, snapshot_dir: str, threads: int = None, quantize: bool = True,
+                 cache: EmbeddingCache = None):
+        import onnxruntime
+        from tokenizers import Tokenizer
+        
+        snapshot = Path(snapshot_dir)
+        config = json.loads((snapshot / "config.json").read_text())
+        max_length = 256
+        if (snapshot / "sentence_bert_config.json").exists():
+            max_length = json.loads((snapshot / "sentence_bert_config.json").read_text())['max_seq_length']
+        
+        self.cache = cache
+        self.dimension = config['hidden_size']
+        self.quantize = quantize
+        if quantize:
+            self.name = f"{self.name}-int8"
+        
+        self.tokenizer = Tokenizer.from_file(str(snapshot / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+        
+        weights = read_safetensors(str(snapshot / "model.safetensors"))
+        model_bytes = build_bert_encoder(weights, config, quantize)
+        
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.inter_op_num_threads = 1
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(model_bytes, options, providers=["CPUExecutionProvider"])
+    
+    def _cache_key(self, text: str) -> str:
+        """Key for the exact text the tokenizer sees"""
+        return EmbeddingCache.make_key(f"{self.name}\0{text}")
+    
+    def encode(self, text):
+        """Embed one text"""
+        if not text or not text.strip():
+            return np.zeros(self.dimension, dtype=np.float32)
+        return self.encode_batch([text])[0]
+    
+    def encode_batch(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """Embed many texts into a contiguous float32 matrix
+        
+        Row i holds the embedding of texts[i]; blank texts get a zero row.
+        Cached texts and duplicates are only embedded once.
+        """
+        matrix = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        
+        pending = {}
+        for i, text in enumerate(texts):
+            if text and text.strip():
+                pending.setdefault(text, []).append(i)
+        
+        if self.cache is not None:
+            for text in list(pending):
+                cached = self.cache.get(self._cache_key(text))
+                if cached is not None:
+                    matrix[pending.pop(text)] = cached
+        
+        # Similar lengths share a batch, so little compute goes to padding
+        ordered = sorted(pending, key=len)
+        for start in range(0, len(ordered), batch_size):
+            batch = ordered[start:start + batch_size]
+            for text, vector in zip(batch, self._run(batch)):
+                matrix[pending[text]] = vector
+                if self.cache is not None:
+                    self.cache.put(self._cache_key(text), vector)
+        
+        return matrix
+    
+    def _run(self, texts: List[str]) -> np.ndarray:
+        """Normalized embeddings for one tokenizer batch"""
+        instrumentation.count('texts_embedded', len(texts))
+        instrumentation.count('characters_embedded', sum(len(text) for text in texts))
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        
+        pooled = self.session.run(None, {"input_ids": input_ids, "attention_mask": attention_mask})[0]
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.maximum(norms, 1e-12)).astype(np.float32)
+    
+    def similarity(self, text1, text2):
+        """Calculate similarity between two texts"""
+        return self.cosine(self.encode(text1), self.encode(text2))
+    
+    @staticmethod
+    def cosine(vec1, vec2):
+        """Cosine similarity between two embedding vectors"""
+        norm1 = np.linalg.norm(vec1)
+        norm2 = np.linalg.norm(vec2)
+        
+        if norm1 == 0 or norm2 == 0:
+            return 0.0
+        
+        return float(np.dot(vec1, vec2) / (norm1 * norm2))
@@ -2,14 +2,60 @@
 Enhanced PDF Processor - Optimized for Target Output Quality
 """
 
+import os
+import json
+import hashlib
+import signal
+import multiprocessing
 import fitz
 import re
-import numpy as np
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from keyword_matcher import KeywordMatcher
+import instrumentation
+
+def available_cpu_count() -> int:
+    """Number of CPU cores this process is allowed to run on"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+# Per-process PDFProcessor used by extraction pool workers
+_worker_processor = None
+
+def _init_extraction_worker(processor, instrument: bool = False, ignore_interrupts: bool = False):
+    """Give each pool worker its own processor copy (and its own fitz handles)"""
+    global _worker_processor
+    _worker_processor = processor
+    
+    # Long-lived pools are shut down by their owner, not by Ctrl-C reaching each worker
+    if ignore_interrupts:
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+    
+    # Forked workers inherit the parent's recorder; start them from a clean one
+    if instrument:
+        instrumentation.enable()
+    else:
+        instrumentation.disable()
+
+def _extract_in_worker(pdf_path: str):
+    """Extract one document inside a pool worker
+    
+    Returns the sections plus the worker's instrumentation data (None when
+    instrumentation is off) for the parent to merge.
+    """
+    sections = _worker_processor.extract_document_content(pdf_path)
+    return sections, instrumentation.drain() if instrumentation.is_enabled() else None
 
 class PDFProcessor:
+    EXTRACTION_VERSION = 1
+    
+    # get_text("dict") defaults minus embedded image data
+    TEXT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+    
     def __init__(self):
         # Patterns for identifying real section headers
         self.header_patterns = [
@@ -20,6 +66,11 @@ class PDFProcessor:
             r'^Chapter\s+\d+|^Part\s+[IVX\d]+',  # Chapters/Parts
         ]
         
+        # All header patterns in one alternation; the named group tells which fired
+        self.header_regex = re.compile('|'.join(
+            f'(?P<pattern_{i}>{pattern})' for i, pattern in enumerate(self.header_patterns)
+        ))
+        
         # High-value keywords for travel planning
         self.travel_keywords = [
             'planning', 'itinerary', 'schedule', 'guide', 'tips', 'advice',
@@ -33,103 +84,282 @@ class PDFProcessor:
             'how to', 'steps', 'guide', 'tips', 'recommendations', 'best',
             'must visit', 'should', 'plan', 'organize', 'book', 'reserve'
         ]
+        
+        # Job correlation terms (4 days, 10 college friends)
+        self.job_terms = ['4 days', 'college', 'friends', 'group', 'student', 'plan', 'trip']
+        self.duration_terms = ['days', 'day', 'itinerary', 'schedule']
+        self.group_terms = ['group', 'friends', 'people', 'party']
+        
+        # One matcher serves every keyword check during extraction
+        self.keyword_matcher = KeywordMatcher({
+            'travel': self.travel_keywords,
+            'actionable': self.actionable_keywords,
+            'job': self.job_terms,
+            'duration': self.duration_terms,
+            'group': self.group_terms
+        })
+        
+        # Decision thresholds used during extraction
+        self.thresholds = {
+            'header_confidence': 0.4,
+            'min_section_words': 30,
+            'fallback_paragraph_words': 50,
+            'fallback_sections_per_page': 3,  # Limit fallback sections per page
+            'section_quality': 0.4
+        }
+    
+    def config_fingerprint(self) -> str:
+        """Stable hash of everything that shapes extraction output
+        
+        Bump EXTRACTION_VERSION whenever extraction logic changes in a way
+        the configuration below does not capture.
+        """
+        config = {
+            'version': self.EXTRACTION_VERSION,
+            'header_patterns': self.header_patterns,
+            'travel_keywords': self.travel_keywords,
+            'actionable_keywords': self.actionable_keywords,
+            'job_terms': self.job_terms,
+            'duration_terms': self.duration_terms,
+            'group_terms': self.group_terms,
+            'thresholds': self.thresholds
+        }
+        payload = json.dumps(config, sort_keys=True).encode('utf-8')
+        return hashlib.sha256(payload).hexdigest()
+    
+    def create_extraction_pool(self, max_workers: int = None) -> ProcessPoolExecutor:
+        """Long-lived extraction pool for a process that already runs threads
+        
+        Workers start through a forkserver (spawn where that is missing)
+        rather than by forking this process, which is unsafe once threads
+        or loaded models hold locks. Pass the pool to extract_documents.
+        """
+        start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        return ProcessPoolExecutor(max_workers=max_workers or available_cpu_count(),
+                                   mp_context=multiprocessing.get_context(start_method),
+                                   initializer=_init_extraction_worker,
+                                   initargs=(self, instrumentation.is_enabled(), True))
+    
+    def extract_documents(self, pdf_paths: List[str], max_workers: int = None,
+                          cache=None, executor: ProcessPoolExecutor = None) -> List[List[Dict[str, Any]]]:
+        """Extract several documents, fanning out to a process pool
+        
+        Results are returned in the order of pdf_paths regardless of which
+        worker finishes first, so merged sections stay reproducible. With a
+        SectionCache, unchanged documents are served from disk and only the
+        misses are extracted. An executor from create_extraction_pool is
+        used instead of starting a pool for this call.
+        """
+        results = [None] * len(pdf_paths)
+        cache_keys = {}
+        
+        if cache is not None:
+            fingerprint = self.config_fingerprint()
+            for i, pdf_path in enumerate(pdf_paths):
+                cache_keys[i] = cache.make_key(pdf_path, fingerprint)
+                sections = cache.get(cache_keys[i])
+                if sections is not None:
+                    # Same bytes may live under another filename
+                    for section in sections:
+                        section['document'] = Path(pdf_path).name
+                    results[i] = sections
+        
+        pending = [i for i in range(len(pdf_paths)) if results[i] is None]
+        pending_paths = [pdf_paths[i] for i in pending]
+        
+        if max_workers is None:
+            max_workers = available_cpu_count()
+        max_workers = max(1, min(max_workers, len(pending_paths)))
+        
+        if executor is not None:
+            extracted = self._extract_in_pool(executor, pending_paths)
+        elif max_workers == 1:
+            extracted = [self.extract_document_content(pdf_path) for pdf_path in pending_paths]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers,
+                                     initializer=_init_extraction_worker,
+                                     initargs=(self, instrumentation.is_enabled())) as pool:
+                extracted = self._extract_in_pool(pool, pending_paths)
+        
+        instrumentation.count('documents_from_cache', len(pdf_paths) - len(pending))
+        
+        for i, sections in zip(pending, extracted):
+            results[i] = sections
+            # Empty output usually means a parse error; do not pin it in the cache
+            if cache is not None and sections:
+                cache.put(cache_keys[i], sections)
+        
+        return results
+    
+    @staticmethod
+    def _extract_in_pool(executor: ProcessPoolExecutor, pdf_paths: List[str]) -> List[List[Dict[str, Any]]]:
+        """Sections of each path from pool workers, merging their instrumentation"""
+        extracted = []
+        for sections, worker_data in executor.map(_extract_in_worker, pdf_paths):
+            instrumentation.merge(worker_data)
+            extracted.append(sections)
+        return extracted
     
     def extract_document_content(self, pdf_path: str) -> List[Dict[str, Any]]:
         """Extract high-quality sections optimized for target output"""
         sections = []
-        
         try:
-            with fitz.open(pdf_path) as doc:
-                # Analyze document structure first
-                doc_analysis = self._analyze_document_structure(doc)
+            with instrumentation.span("layout_parse"):
+                with fitz.open(pdf_path) as doc:
+                    # Parse every page once; all later stages read the line table
+                    layout = self._extract_document_layout(doc)
                 
-                # Extract sections with enhanced detection
-                for page_num in range(len(doc)):
-                    page = doc[page_num]
-                    page_sections = self._extract_high_quality_sections(
-                        page, page_num + 1, pdf_path, doc_analysis
-                    )
-                    sections.extend(page_sections)
+                # Analyze document structure first
+                doc_analysis = self._analyze_document_structure(layout)
             
-            # Post-process for target output quality
-            sections = self._optimize_sections_for_target_output(sections)
-            return sections
+            instrumentation.count('documents_parsed')
+            instrumentation.count('pages_parsed', len(layout['pages']))
             
+            # Extract sections with enhanced detection
+            for page_index, page_lines in enumerate(layout['pages']):
+                sections.extend(self._extract_page_sections(page_lines, page_index + 1, pdf_path, doc_analysis))
+        
         except Exception as e:
             print(f"Error processing {pdf_path}: {e}")
-            return []
+        
+        # Post-process for target output quality
+        return self._sort_sections_for_target_output(sections)
     
-    def _analyze_document_structure(self, doc) -> Dict[str, Any]:
-        """Analyze document to understand formatting patterns"""
-        font_sizes = []
-        font_flags = []
+    def iter_sections(self, pdf_path: str) -> Iterator[Dict[str, Any]]:
+        """Yield scored-ready sections page by page
+        
+        Sections carry the same quality_score and job_relevance fields as
+        extract_document_content, but arrive in page order and are never
+        collected into a per-document list. The header threshold needs the
+        whole document's font sizes, so a first pass only sums them; the
+        second parses, classifies and yields one page at a time, keeping
+        memory flat in the page count at the cost of parsing text twice.
+        """
+        try:
+            with fitz.open(pdf_path) as doc:
+                with instrumentation.span("layout_parse"):
+                    doc_analysis = self._analyze_document_structure(self._measure_font_sizes(doc))
+                
+                instrumentation.count('documents_parsed')
+                instrumentation.count('pages_parsed', doc.page_count)
+                
+                for page_index, page in enumerate(doc):
+                    with instrumentation.span("layout_parse"):
+                        page_lines = self._parse_page_lines(page)
+                    
+                    # Spans close before yielding so consumers' spans do not nest inside
+                    page_sections = self._extract_page_sections(page_lines, page_index + 1, pdf_path, doc_analysis)
+                    del page_lines
+                    
+                    yield from page_sections
         
+        except Exception as e:
+            print(f"Error processing {pdf_path}: {e}")
+    
+    def _extract_page_sections(self, page_lines: List[tuple], page_num: int, pdf_path: str,
+                               doc_analysis: Dict) -> List[Dict[str, Any]]:
+        """Detect one page's sections and keep those worth scoring"""
+        with instrumentation.span("header_detection"):
+            page_sections = self._extract_high_quality_sections(page_lines, page_num, pdf_path, doc_analysis)
+            page_sections = [
+                section for section in page_sections
+                if self._prepare_section_for_target_output(section)
+            ]
+        instrumentation.count('lines_classified', len(page_lines))
+        instrumentation.count('sections_extracted', len(page_sections))
+        return page_sections
+    
+    def _extract_document_layout(self, doc) -> Dict[str, Any]:
+        """Parse each page's layout once into a compact line table
+        
+        Every page becomes a list of (text, max span size, is_bold) tuples
+        in reading order. Span font sizes are summed on the way so that
+        structure analysis does not need a second parse.
+        """
+        font_sizes = {'font_size_total': 0.0, 'span_count': 0}
+        pages = [self._parse_page_lines(page, font_sizes) for page in doc]
+        return {'pages': pages, **font_sizes}
+    
+    def _measure_font_sizes(self, doc) -> Dict[str, Any]:
+        """Span font size totals of a document, without keeping its lines"""
+        font_sizes = {'font_size_total': 0.0, 'span_count': 0}
         for page in doc:
-            blocks = page.get_text("dict")["blocks"]
-            for block in blocks:
-                if "lines" not in block:
-                    continue
-                for line in block["lines"]:
-                    for span in line["spans"]:
-                        font_sizes.append(span["size"])
-                        font_flags.append(span["flags"])
+            self._parse_page_lines(page, font_sizes)
+        return font_sizes
+    
+    def _parse_page_lines(self, page, font_sizes: Dict[str, Any] = None) -> List[tuple]:
+        """One page as (text, max span size, is_bold) tuples in reading order
+        
+        Adds each span's size to font_sizes when given. Image blocks carry
+        no lines, so they are left out of the parse instead of decoded.
+        """
+        page_lines = []
+        for block in page.get_text("dict", flags=self.TEXT_FLAGS)["blocks"]:
+            if "lines" not in block:
+                continue
+            
+            for line in block["lines"]:
+                line_text = ""
+                font_size = 0
+                is_bold = False
+                
+                for span in line["spans"]:
+                    line_text += span["text"]
+                    font_size = max(font_size, span.get("size", 12))
+                    if span.get("flags", 0) & 16:  # Bold flag
+                        is_bold = True
+                    if font_sizes is not None:
+                        font_sizes['font_size_total'] += span["size"]
+                        font_sizes['span_count'] += 1
+                
+                page_lines.append((line_text, font_size, is_bold))
+        return page_lines
+    
+    def _analyze_document_structure(self, layout: Dict[str, Any]) -> Dict[str, Any]:
+        """Analyze document to understand formatting patterns"""
+        span_count = layout['span_count']
         
         # Determine header characteristics
-        if font_sizes:
-            avg_size = np.mean(font_sizes)
+        if span_count:
+            avg_size = layout['font_size_total'] / span_count
             header_threshold = avg_size + 1.5  # Headers are typically larger
         else:
             header_threshold = 12
         
         return {
-            'avg_font_size': avg_size if font_sizes else 12,
+            'avg_font_size': avg_size if span_count else 12,
             'header_threshold': header_threshold,
             'bold_flag': 16  # spaCy bold flag
         }
     
-    def _extract_high_quality_sections(self, page, page_num: int, pdf_path: str, 
-                                     doc_analysis: Dict) -> List[Dict[str, Any]]:
+    def _extract_high_quality_sections(self, page_lines: List[tuple], page_num: int, 
+                                     pdf_path: str, doc_analysis: Dict) -> List[Dict[str, Any]]:
         """Extract sections with enhanced header detection"""
-        blocks = page.get_text("dict")["blocks"]
         sections = []
         current_section = None
         
-        for block in blocks:
-            if "lines" not in block:
+        for line_text, font_size, is_bold in page_lines:
+            line_text = line_text.strip()
+            if not line_text:
                 continue
+            
+            # Enhanced header detection
+            if self._is_high_quality_header(line_text, font_size, is_bold, doc_analysis):
+                # Save current section
+                if current_section and self._is_valuable_section(current_section):
+                    sections.append(current_section)
                 
-            for line in block["lines"]:
-                line_text = ""
-                font_size = 0
-                is_bold = False
-                
-                for span in line["spans"]:
-                    line_text += span["text"]
-                    font_size = max(font_size, span.get("size", 12))
-                    if span.get("flags", 0) & 16:  # Bold flag
-                        is_bold = True
-                
-                line_text = line_text.strip()
-                if not line_text:
-                    continue
-                
-                # Enhanced header detection
-                if self._is_high_quality_header(line_text, font_size, is_bold, doc_analysis):
-                    # Save current section
-                    if current_section and self._is_valuable_section(current_section):
-                        sections.append(current_section)
-                    
-                    # Start new section
-                    current_section = {
-                        'title': self._clean_and_improve_title(line_text),
-                        'content': '',
-                        'page_number': page_num,
-                        'document': Path(pdf_path).name,
-                        'header_confidence': self._calculate_header_confidence(line_text, font_size, is_bold),
-                        'travel_relevance': self._calculate_travel_relevance(line_text)
-                    }
-                elif current_section:
-                    current_section['content'] += line_text + " "
+                # Start new section
+                current_section = {
+                    'title': self._clean_and_improve_title(line_text),
+                    'content': '',
+                    'page_number': page_num,
+                    'document': Path(pdf_path).name,
+                    'header_confidence': self._calculate_header_confidence(line_text, font_size, is_bold),
+                    'travel_relevance': self._calculate_travel_relevance(line_text)
+                }
+            elif current_section:
+                current_section['content'] += line_text + " "
         
         # Add final section
         if current_section and self._is_valuable_section(current_section):
@@ -137,7 +367,7 @@ class PDFProcessor:
         
         # If no good sections found, create content-based sections
         if not sections:
-            sections = self._create_fallback_sections(page, page_num, pdf_path)
+            sections = self._create_fallback_sections(page_lines, page_num, pdf_path)
         
         return sections
     
@@ -147,31 +377,47 @@ class PDFProcessor:
         if len(text) < 8 or len(text) > 120:
             return False
         
-        confidence = 0.0
+        formatting = 0.0
         
         # Font size check
         if font_size > doc_analysis['header_threshold']:
-            confidence += 0.3
+            formatting += 0.3
         
         # Bold formatting
         if is_bold:
-            confidence += 0.2
-        
-        # Pattern matching
-        for pattern in self.header_patterns:
-            if re.match(pattern, text):
-                confidence += 0.3
-                break
+            formatting += 0.2
         
         # Travel relevance boost
-        if any(keyword in text.lower() for keyword in self.travel_keywords):
-            confidence += 0.2
+        travel_boost = self.keyword_matcher.contains_any(text.lower(), 'travel')
         
         # Avoid sentence patterns
-        if text.count('.') > 1 or text.count(',') > 3:
-            confidence -= 0.3
+        sentence_like = text.count('.') > 1 or text.count(',') > 3
+        
+        def finish(confidence: float) -> float:
+            if travel_boost:
+                confidence += 0.2
+            if sentence_like:
+                confidence -= 0.3
+            return confidence
+        
+        # Pattern matching only matters when it can flip the decision
+        threshold = self.thresholds['header_confidence']
+        if finish(formatting) > threshold:
+            return True
+        if finish(formatting + 0.3) <= threshold:
+            return False
         
-        return confidence > 0.4
+        return self._match_header_pattern(text) is not None
+    
+    def _match_header_pattern(self, text: str):
+        """Name of the first header pattern matching text, or None"""
+        # Every pattern starts with an uppercase letter, a digit or whitespace
+        lead = text[:1]
+        if not (lead.isdigit() or lead.isspace() or 'A' <= lead <= 'Z'):
+            return None
+        
+        match = self.header_regex.match(text)
+        return match.lastgroup if match else None
     
     def _clean_and_improve_title(self, title: str) -> str:
         """Clean and improve title quality"""
@@ -206,23 +452,21 @@ class PDFProcessor:
             confidence += 0.2
         
         # Content quality
-        if any(keyword in text.lower() for keyword in self.actionable_keywords):
+        if self.keyword_matcher.contains_any(text.lower(), 'actionable'):
             confidence += 0.3
         
         return confidence
     
     def _calculate_travel_relevance(self, text: str) -> float:
         """Calculate travel planning relevance"""
-        text_lower = text.lower()
+        matches = self.keyword_matcher.count(text.lower(), ['travel', 'actionable'])
         relevance = 0.0
         
         # Travel keyword matching
-        travel_matches = sum(1 for keyword in self.travel_keywords if keyword in text_lower)
-        relevance += min(travel_matches * 0.2, 1.0)
+        relevance += min(matches['travel'] * 0.2, 1.0)
         
         # Actionable content bonus
-        actionable_matches = sum(1 for keyword in self.actionable_keywords if keyword in text_lower)
-        relevance += min(actionable_matches * 0.3, 0.6)
+        relevance += min(matches['actionable'] * 0.3, 0.6)
         
         return relevance
     
@@ -232,28 +476,30 @@ class PDFProcessor:
         title = section.get('title', '')
         
         # Minimum content length
-        if len(content.split()) < 30:
+        if len(content.split()) < self.thresholds['min_section_words']:
             return False
         
         # Check for travel relevance
         combined_text = f"{title} {content}".lower()
-        travel_score = sum(1 for keyword in self.travel_keywords if keyword in combined_text)
+        travel_score = self.keyword_matcher.count(combined_text, ['travel'])['travel']
         
         return travel_score >= 2 or section.get('travel_relevance', 0) > 0.3
     
-    def _create_fallback_sections(self, page, page_num: int, pdf_path: str) -> List[Dict[str, Any]]:
+    def _create_fallback_sections(self, page_lines: List[tuple], page_num: int, 
+                                pdf_path: str) -> List[Dict[str, Any]]:
         """Create sections when header detection fails"""
-        full_text = page.get_text()
+        # Same text as page.get_text(): one line per row, blank rows split paragraphs
+        full_text = "".join(line_text + "\n" for line_text, _, _ in page_lines)
         
         # Split by double line breaks or paragraph patterns
         paragraphs = []
         for para in full_text.split('\n\n'):
             para = para.strip()
-            if len(para.split()) > 50:  # Substantial paragraphs only
+            if len(para.split()) > self.thresholds['fallback_paragraph_words']:  # Substantial paragraphs only
                 paragraphs.append(para)
         
         sections = []
-        for i, paragraph in enumerate(paragraphs[:3]):  # Limit to 3 per page
+        for i, paragraph in enumerate(paragraphs[:self.thresholds['fallback_sections_per_page']]):
             # Create title from first sentence or meaningful phrase
             sentences = paragraph.split('.')
             title = self._extract_meaningful_title(sentences[0], paragraph)
@@ -288,27 +534,27 @@ class PDFProcessor:
         title = first_sentence[:60] + "..." if len(first_sentence) > 60 else first_sentence
         return title.strip()
     
-    def _optimize_sections_for_target_output(self, sections: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Optimize sections specifically for target output quality"""
-        optimized_sections = []
-        
-        for section in sections:
-            # Calculate comprehensive quality score
-            quality_score = self._calculate_comprehensive_quality(section)
-            
-            # Only keep high-quality sections
-            if quality_score > 0.4:
-                section['quality_score'] = quality_score
-                section['job_relevance'] = self._calculate_job_relevance(section)
-                optimized_sections.append(section)
-        
-        # Sort by quality and relevance
-        optimized_sections.sort(
+    def _prepare_section_for_target_output(self, section: Dict[str, Any]) -> bool:
+        """Attach quality and job scores; return whether the section is kept"""
+        # Calculate comprehensive quality score
+        quality_score = self._calculate_comprehensive_quality(section)
+        
+        # Only keep high-quality sections
+        if quality_score > self.thresholds['section_quality']:
+            section['quality_score'] = quality_score
+            section['job_relevance'] = self._calculate_job_relevance(section)
+            return True
+        
+        return False
+    
+    def _sort_sections_for_target_output(self, sections: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Sort prepared sections by quality and relevance"""
+        sections.sort(
             key=lambda x: (x['quality_score'] + x['job_relevance']) / 2, 
             reverse=True
         )
         
-        return optimized_sections
+        return sections
     
     def _calculate_comprehensive_quality(self, section: Dict[str, Any]) -> float:
         """Calculate comprehensive section quality"""
@@ -342,19 +588,18 @@ class PDFProcessor:
         title = section.get('title', '').lower()
         combined = f"{title} {content}"
         
+        matches = self.keyword_matcher.count(combined, ['job', 'duration', 'group'])
         relevance = 0.0
         
         # Job-specific terms
-        job_terms = ['4 days', 'college', 'friends', 'group', 'student', 'plan', 'trip']
-        matches = sum(1 for term in job_terms if term in combined)
-        relevance += min(matches * 0.15, 0.6)
+        relevance += min(matches['job'] * 0.15, 0.6)
         
         # Duration indicators
-        if any(term in combined for term in ['days', 'day', 'itinerary', 'schedule']):
+        if matches['duration']:
             relevance += 0.2
         
         # Group indicators
-        if any(term in combined for term in ['group', 'friends', 'people', 'party']):
+        if matches['group']:
             relevance += 0.2
         
         return min(relevance, 1.0)
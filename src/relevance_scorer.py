@@ -2,69 +2,277 @@
 Enhanced Relevance Scorer - Optimized for Target Output
 """
 
+import heapq
 import numpy as np
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Iterable
+from keyword_matcher import KeywordMatcher
+from top_k import top_k_indices
+from ann_index import IVFIndex
+import instrumentation
 
 class RelevanceScorer:
     def __init__(self, semantic_analyzer):
         self.semantic_analyzer = semantic_analyzer
         
-        # Optimized weights for target output
-        self.weights = {
+        # Optimized weights for target output, rescaled to sum to 1
+        self.weights = self._normalize_weights({
             'exact_job_match': 0.35,      # Highest weight for job correlation
             'critical_keywords': 0.25,    # Critical planning keywords
             'semantic_similarity': 0.20,   # Semantic understanding
             'actionable_content': 0.10,    # Actionable information
             'section_quality': 0.05,      # Section quality
-            'practical_value': 0.05       # Practical value
-        }
+            'practical_value': 0.05,      # Practical value
+            'bm25_relevance': 0.10        # Lexical retrieval against the job
+        })
+        
+        # Above this many sections, only sections sharing a term with the job
+        # are fully scored. The rest could still score on other factors, so
+        # this can change results (0 disables)
+        self.candidate_min_sections = 5000
+        
+        # Above this many, only the best semantic and BM25 matches are; shared
+        # corpus features find the semantic ones through an IVF index
+        self.ann_min_sections = 200000
+        self.ann_shortlist_size = 2000
+        self.ann_probes = 8
+        
+        # Terms behind the target-specific boosts and penalties
+        self.planning_terms = ['planning', 'itinerary', 'guide', 'tips', 'organize']
+        self.generic_terms = ['introduction', 'overview', 'welcome', 'about', 'general']
+        self.academic_terms = ['university', 'college', 'student', 'montpellier']
+    
+    def build_corpus_features(self, sections: List[Dict[str, Any]], embeddings: np.ndarray = None,
+                              build_ann: bool = True) -> Dict[str, Any]:
+        """Query-independent features of a section list, shared by every query over it
+        
+        Holds the BM25 index and the section embeddings, the two costs of
+        score_all_sections that do not depend on persona or job. Stored
+        embeddings, one row per section, can be passed in to skip embedding.
+        Collections of ann_min_sections or more also get an IVF index,
+        unless build_ann is off because too few queries would repay it.
+        """
+        with instrumentation.span("corpus_features"):
+            if embeddings is None:
+                embeddings = self.semantic_analyzer.embed_sections(sections)
+            elif len(embeddings) != len(sections):
+                raise ValueError(f"Got {len(embeddings)} embeddings for {len(sections)} sections")
+            
+            features = {
+                'sections': sections,
+                'bm25_index': self.semantic_analyzer.build_bm25_index(sections),
+                'embeddings': embeddings,
+                'ann_index': None
+            }
+            if build_ann and len(sections) >= self.ann_min_sections:
+                with instrumentation.span("ann_build"):
+                    features['ann_index'] = IVFIndex.build(embeddings, n_probe=self.ann_probes)
+            return features
     
     def score_all_sections(self, sections: List[Dict[str, Any]], 
-                          persona: str, job_description: str) -> List[Tuple[Dict[str, Any], float]]:
-        """Score sections for target output accuracy"""
+                          persona: str, job_description: str,
+                          top_k: int = None, features: Dict[str, Any] = None) -> List[Tuple[Dict[str, Any], float]]:
+        """Score sections for target output accuracy
+        
+        With top_k set, only the k best sections are selected (by partial
+        partition) and turned into result tuples. Ties rank the section
+        that came first in the input higher, with or without top_k.
+        features, from build_corpus_features over the same section list,
+        skips re-indexing and re-embedding the sections.
+        """
+        if features is not None and features['sections'] is not sections:
+            raise ValueError("Corpus features were built for a different section list")
         
         print(f"🎯 Scoring {len(sections)} sections for target accuracy...")
         
+        # Nothing to score: skip requirement analysis and the models it loads
+        if not sections:
+            return []
+        
         # Analyze requirements
+        with instrumentation.span("requirements_analysis"):
+            requirements = self.semantic_analyzer.analyze_persona_requirements(
+                persona, job_description
+            )
+            requirements['adjustment_matcher'] = self._build_adjustment_matcher(requirements)
+        
+        # BM25 over this collection, scored once through the inverted index
+        with instrumentation.span("bm25"):
+            if features is not None:
+                bm25_index = features['bm25_index']
+            else:
+                bm25_index = self.semantic_analyzer.build_bm25_index(sections)
+            bm25_scores = self.semantic_analyzer.calculate_bm25_scores(bm25_index, requirements)
+        
+        all_embeddings = features['embeddings'] if features is not None else None
+        candidate_ids = None
+        if len(sections) >= self.ann_min_sections:
+            # Run the heuristics only on the closest semantic and lexical matches
+            if all_embeddings is None:
+                all_embeddings = self.semantic_analyzer.embed_sections(sections)
+            candidate_ids = self._shortlist(
+                sections, all_embeddings, features['ann_index'] if features is not None else None,
+                bm25_scores, requirements
+            )
+            if len(candidate_ids):
+                print(f"  Semantic and BM25 shortlist kept {len(candidate_ids)} of {len(sections)} sections")
+            else:
+                candidate_ids = None
+        elif self.candidate_min_sections and len(sections) >= self.candidate_min_sections:
+            # Skip the heuristics for sections sharing no term with the job
+            candidate_ids = bm25_index.candidates(requirements['bm25_query'])
+            if len(candidate_ids):
+                print(f"  BM25 prefilter kept {len(candidate_ids)} of {len(sections)} sections "
+                      f"(sections sharing no term with the job are not scored)")
+            else:
+                candidate_ids = None
+        
+        if candidate_ids is not None:
+            sections = [sections[i] for i in candidate_ids]
+            bm25_scores = bm25_scores[candidate_ids]
+        requirements['bm25_scores'] = bm25_scores
+        
+        # Embed every section in one batched pass, unless the corpus already is
+        if all_embeddings is None:
+            section_embeddings = self.semantic_analyzer.embed_sections(sections)
+        elif candidate_ids is None:
+            section_embeddings = all_embeddings
+        else:
+            section_embeddings = all_embeddings[candidate_ids]
+        
+        # (N, F) factor matrix; weighted scores come from one matrix product
+        factor_names = list(self.weights)
+        relevance_matrix = self.semantic_analyzer.calculate_relevance_matrix(
+            sections, requirements, factor_names, section_embeddings
+        )
+        weight_vector = np.array([self.weights[name] for name in factor_names])
+        
+        with instrumentation.span("target_adjustments"):
+            adjustments = np.array([
+                self._target_adjustment_factor(section, requirements) for section in sections
+            ])
+        instrumentation.count('sections_scored', len(sections))
+        final_scores = np.maximum(relevance_matrix @ weight_vector * adjustments, 0.0)
+        
+        # Highest score first, ties broken by input position
+        if top_k is None:
+            ranking = np.lexsort((np.arange(len(final_scores)), -final_scores))
+        else:
+            ranking = top_k_indices(final_scores, top_k)
+        
+        columns = {name: j for j, name in enumerate(factor_names)}
+        detail_columns = ['exact_job_match', 'critical_keywords', 'semantic_similarity', 'actionable_content']
+        
+        scored_sections = []
+        for i in ranking:
+            details = {
+                name: float(relevance_matrix[i, columns[name]]) if name in columns else 0
+                for name in detail_columns
+            }
+            details['final_score'] = float(final_scores[i])
+            scored_sections.append((sections[i], float(final_scores[i]), details))
+        
+        if scored_sections:
+            print(f"✅ Scored sections - Top score: {scored_sections[0][1]:.3f}")
+        return scored_sections
+    
+    def _shortlist(self, sections: List[Dict[str, Any]], embeddings: np.ndarray, ann_index,
+                   bm25_scores: np.ndarray, requirements: Dict[str, Any]) -> np.ndarray:
+        """Ascending ids of the top semantic and top BM25 sections
+        
+        Semantic neighbours come from the IVF index when the corpus
+        features carry one, otherwise from an exact cosine scan.
+        """
+        with instrumentation.span("shortlist"):
+            if ann_index is not None:
+                semantic_ids, _ = ann_index.search(requirements['query_embedding'], self.ann_shortlist_size)
+            else:
+                similarities = self.semantic_analyzer.calculate_semantic_similarities(
+                    sections, requirements, embeddings
+                )
+                semantic_ids = top_k_indices(similarities, self.ann_shortlist_size)
+            
+            lexical_ids = top_k_indices(bm25_scores, self.ann_shortlist_size)
+            lexical_ids = lexical_ids[bm25_scores[lexical_ids] > 0]
+            candidate_ids = np.union1d(semantic_ids, lexical_ids)
+        
+        instrumentation.count('sections_shortlisted', len(candidate_ids))
+        return candidate_ids
+    
+    def score_section_stream(self, sections: Iterable[Dict[str, Any]], persona: str, 
+                             job_description: str, top_k: int = 7) -> List[Tuple[Dict[str, Any], float]]:
+        """Score a stream of sections keeping only a bounded top-k heap
+        
+        Memory stays proportional to top_k however many sections the stream
+        yields. Ties keep the section that arrived first. BM25 relevance
+        needs collection statistics, so it is left out and the remaining
+        weights are rescaled; rankings can differ from score_all_sections.
+        """
+        print(f"🎯 Streaming sections for target accuracy (top {top_k})...")
+        
         requirements = self.semantic_analyzer.analyze_persona_requirements(
             persona, job_description
         )
+        requirements['adjustment_matcher'] = self._build_adjustment_matcher(requirements)
+        weights = self._normalize_weights(self.weights, drop=('bm25_relevance',))
         
-        scored_sections = []
+        # Min-heap of (score, -arrival, scored_section): the root is evicted first
+        heap = []
+        section_count = 0
         
         for section in sections:
-            # Calculate relevance scores
-            relevance_scores = self.semantic_analyzer.calculate_enhanced_relevance(
-                section, requirements
-            )
-            
-            # Calculate weighted final score
-            final_score = self._calculate_weighted_score(relevance_scores)
+            scored_section = self._score_section(section, requirements, weights=weights)
+            entry = (scored_section[1], -section_count, scored_section)
+            section_count += 1
+            instrumentation.count('sections_scored')
             
-            # Apply target-specific adjustments
-            final_score = self._apply_target_adjustments(
-                final_score, section, requirements
-            )
-            
-            scored_sections.append((section, final_score, {
-                'exact_job_match': relevance_scores.get('exact_job_match', 0),
-                'critical_keywords': relevance_scores.get('critical_keywords', 0),
-                'semantic_similarity': relevance_scores.get('semantic_similarity', 0),
-                'actionable_content': relevance_scores.get('actionable_content', 0),
-                'final_score': final_score
-            }))
-        
-        # Sort by score (highest first)
-        scored_sections.sort(key=lambda x: x[1], reverse=True)
-        
-        print(f"✅ Scored sections - Top score: {scored_sections[0][1]:.3f}")
+            if len(heap) < top_k:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+        
+        scored_sections = [entry[2] for entry in sorted(heap, reverse=True)]
+        
+        if scored_sections:
+            print(f"✅ Scored {section_count} sections - Top score: {scored_sections[0][1]:.3f}")
         return scored_sections
     
-    def _calculate_weighted_score(self, scores: Dict[str, float]) -> float:
+    def _score_section(self, section: Dict[str, Any], requirements: Dict[str, Any],
+                       section_embedding: np.ndarray = None,
+                       weights: Dict[str, float] = None) -> Tuple[Dict[str, Any], float, Dict[str, float]]:
+        """Score a single section against analyzed requirements"""
+        # Calculate relevance scores
+        relevance_scores = self.semantic_analyzer.calculate_enhanced_relevance(
+            section, requirements, section_embedding
+        )
+        
+        # Calculate weighted final score
+        final_score = self._calculate_weighted_score(relevance_scores, weights)
+        
+        # Apply target-specific adjustments
+        final_score = self._apply_target_adjustments(
+            final_score, section, requirements
+        )
+        
+        return (section, final_score, {
+            'exact_job_match': relevance_scores.get('exact_job_match', 0),
+            'critical_keywords': relevance_scores.get('critical_keywords', 0),
+            'semantic_similarity': relevance_scores.get('semantic_similarity', 0),
+            'actionable_content': relevance_scores.get('actionable_content', 0),
+            'final_score': final_score
+        })
+    
+    @staticmethod
+    def _normalize_weights(weights: Dict[str, float], drop: Tuple[str, ...] = ()) -> Dict[str, float]:
+        """Weights without the dropped factors, rescaled to sum to 1"""
+        kept = {factor: weight for factor, weight in weights.items() if factor not in drop}
+        total = sum(kept.values())
+        return {factor: weight / total for factor, weight in kept.items()}
+    
+    def _calculate_weighted_score(self, scores: Dict[str, float], weights: Dict[str, float] = None) -> float:
         """Calculate weighted final score"""
         total_score = 0.0
         
-        for factor, weight in self.weights.items():
+        for factor, weight in (weights or self.weights).items():
             score = scores.get(factor, 0.0)
             total_score += weight * score
         
@@ -73,42 +281,60 @@ class RelevanceScorer:
     def _apply_target_adjustments(self, base_score: float, section: Dict[str, Any], 
                                 requirements: Dict[str, Any]) -> float:
         """Apply adjustments for target output quality"""
+        adjusted_score = base_score * self._target_adjustment_factor(section, requirements)
+        return max(0.0, adjusted_score)
+    
+    def _target_adjustment_factor(self, section: Dict[str, Any], 
+                                  requirements: Dict[str, Any]) -> float:
+        """Combined boost/penalty multiplier for target output quality"""
         
-        adjusted_score = base_score
+        factor = 1.0
         content = section.get('content', '').lower()
         title = section.get('title', '').lower()
         
-        # Heavy boost for job-specific content
-        job_analysis = requirements['job_analysis']
+        matcher = requirements['adjustment_matcher']
+        content_matches = matcher.count(content, ['duration', 'group_size', 'group_type', 'academic'])
         
-        if job_analysis['duration'] and job_analysis['duration'].lower() in content:
-            adjusted_score *= 1.5  # 50% boost
+        # Heavy boost for job-specific content
+        if content_matches['duration']:
+            factor *= 1.5  # 50% boost
         
-        if job_analysis['group_size'] and str(job_analysis['group_size']) in content:
-            adjusted_score *= 1.4  # 40% boost
+        if content_matches['group_size']:
+            factor *= 1.4  # 40% boost
         
-        if job_analysis['group_type'] and job_analysis['group_type'].lower() in content:
-            adjusted_score *= 1.3  # 30% boost
+        if content_matches['group_type']:
+            factor *= 1.3  # 30% boost
         
         # Boost for planning-related titles
-        planning_terms = ['planning', 'itinerary', 'guide', 'tips', 'organize']
-        if any(term in title for term in planning_terms):
-            adjusted_score *= 1.2  # 20% boost
+        if matcher.contains_any(title, 'planning'):
+            factor *= 1.2  # 20% boost
         
         # Heavy penalty for generic introductory content
-        generic_terms = ['introduction', 'overview', 'welcome', 'about', 'general']
-        if any(term in title or term in content[:100] for term in generic_terms):
-            adjusted_score *= 0.3  # 70% penalty
+        if matcher.contains_any(title, 'generic') or matcher.contains_any(content[:100], 'generic'):
+            factor *= 0.3  # 70% penalty
         
         # Penalty for sentence fragments as titles
         if len(title) > 80 or title.count(',') > 2:
-            adjusted_score *= 0.5  # 50% penalty
+            factor *= 0.5  # 50% penalty
         
         # Boost for university/college content (matches job requirement)
-        if any(term in content for term in ['university', 'college', 'student', 'montpellier']):
-            adjusted_score *= 1.15  # 15% boost
+        if content_matches['academic']:
+            factor *= 1.15  # 15% boost
         
-        return max(0.0, adjusted_score)
+        return factor
+    
+    def _build_adjustment_matcher(self, requirements: Dict[str, Any]) -> KeywordMatcher:
+        """Compile the keyword sets used by target adjustments for one job"""
+        job_analysis = requirements['job_analysis']
+        
+        return KeywordMatcher({
+            'duration': [job_analysis['duration']] if job_analysis['duration'] else [],
+            'group_size': [str(job_analysis['group_size'])] if job_analysis['group_size'] else [],
+            'group_type': [job_analysis['group_type']] if job_analysis['group_type'] else [],
+            'planning': self.planning_terms,
+            'generic': self.generic_terms,
+            'academic': self.academic_terms
+        })
     
     def get_top_sections_for_target_output(self, scored_sections: List[Tuple], 
                                          top_k: int = 7) -> List[Dict[str, Any]]:
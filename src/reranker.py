@@ -0,0 +1,131 @@
+"""
+Cascade Reranker - Cross-Encoder Second Stage over First-Stage Candidates
+"""
+
+import time
+import numpy as np
+from typing import List, Dict, Any, Tuple
+import instrumentation
+
+class CascadeReranker:
+    """Rerank the first-stage top-N sections with the FlashRank cross-encoder
+    
+    Candidates are scored in batches of batch_size, each passage truncated
+    to max_passage_chars. With a latency budget, every batch is sized from
+    the per-passage cost observed so far to fit the remaining budget, and
+    reranking stops once not even one more passage fits. Before any cost
+    is known, a probe batch of probe_size passages measures it; the
+    estimate carries over to later calls. Candidates left out keep their
+    first-stage order below the reranked ones. Reranked sections are
+    ordered by a blend of the min-max normalized first-stage score and the
+    cross-encoder score.
+    """
+    
+    def __init__(self, ranker, top_n: int = 20, batch_size: int = 16, max_passage_chars: int = 1000,
+                 latency_budget_ms: float = None, rerank_weight: float = 0.5, probe_size: int = 2):
+        self.ranker = ranker
+        self.top_n = top_n
+        self.batch_size = max(1, batch_size)
+        self.max_passage_chars = max_passage_chars
+        self.latency_budget_ms = latency_budget_ms
+        self.rerank_weight = rerank_weight
+        self.probe_size = max(1, probe_size)
+        
+        # Observed cross-encoder cost, refined by every budgeted batch
+        self.per_passage_ms = None
+        self.last_stats = {}
+    
+    def warm(self):
+        """Load the cross-encoder now, so its load time is not charged to a budget"""
+        resolve = getattr(self.ranker, 'resolve', None)
+        if resolve is not None:
+            resolve()
+    
+    def passage_text(self, section: Dict[str, Any]) -> str:
+        """Title and content as one truncated passage"""
+        return f"{section.get('title', '')}. {section.get('content', '')}"[:self.max_passage_chars]
+    
+    def rerank(self, scored_sections: List[Tuple], query: str) -> List[Tuple]:
+        """Rerank the head of a best-first scored list, leaving the tail as is"""
+        candidates = scored_sections[:self.top_n]
+        if not candidates:
+            self.last_stats = {'candidates': 0, 'reranked': 0, 'batches': 0, 'elapsed_ms': 0.0}
+            return list(scored_sections)
+        
+        # The budget covers reranking only, not a lazy model's first load
+        self.warm()
+        start = time.perf_counter()
+        limit = len(candidates)
+        rerank_scores = []
+        batches = 0
+        
+        while len(rerank_scores) < limit:
+            size = min(self.batch_size, limit - len(rerank_scores))
+            
+            if self.latency_budget_ms is not None:
+                # Only start a batch the remaining budget can pay for
+                remaining_ms = self.latency_budget_ms - (time.perf_counter() - start) * 1000
+                if self.per_passage_ms is None:
+                    size = min(size, self.probe_size)
+                else:
+                    size = min(size, int(remaining_ms / self.per_passage_ms))
+                if size < 1 or remaining_ms <= 0:
+                    break
+            
+            batch = candidates[len(rerank_scores):len(rerank_scores) + size]
+            batch_start = time.perf_counter()
+            with instrumentation.span("rerank_batch"):
+                rerank_scores.extend(self._score_batch(batch, query))
+            instrumentation.count('passages_reranked', len(batch))
+            batches += 1
+            
+            if self.latency_budget_ms is not None:
+                self.per_passage_ms = (time.perf_counter() - batch_start) * 1000 / len(batch)
+        
+        if not rerank_scores:
+            self.last_stats = {'candidates': len(candidates), 'reranked': 0, 'batches': 0,
+                               'elapsed_ms': (time.perf_counter() - start) * 1000}
+            return list(scored_sections)
+        
+        reranked = candidates[:len(rerank_scores)]
+        first_stage = self._normalize([score for _, score, _ in reranked])
+        blended = (1 - self.rerank_weight) * first_stage + self.rerank_weight * np.array(rerank_scores)
+        
+        results = []
+        for (section, score, details), rerank_score, final_score in zip(reranked, rerank_scores, blended):
+            details = dict(details, first_stage_score=score, rerank_score=float(rerank_score),
+                           final_score=float(final_score))
+            results.append((section, float(final_score), details))
+        
+        # Highest blended score first; ties keep first-stage order
+        order = sorted(range(len(results)), key=lambda i: -results[i][1])
+        results = [results[i] for i in order]
+        
+        self.last_stats = {
+            'candidates': len(candidates),
+            'reranked': len(reranked),
+            'batches': batches,
+            'elapsed_ms': (time.perf_counter() - start) * 1000
+        }
+        return results + list(scored_sections[len(reranked):])
+    
+    def _score_batch(self, batch: List[Tuple], query: str) -> List[float]:
+        """Cross-encoder scores for one batch, in batch order"""
+        from flashrank import RerankRequest
+        
+        passages = [{'id': i, 'text': self.passage_text(section)} for i, (section, _, _) in enumerate(batch)]
+        results = self.ranker.rerank(RerankRequest(query=query, passages=passages))
+        
+        scores = [0.0] * len(batch)
+        for result in results:
+            scores[result['id']] = float(result['score'])
+        return scores
+    
+    @staticmethod
+    def _normalize(scores: List[float]) -> np.ndarray:
+        """Min-max scale to [0, 1]; all-equal scores map to 1"""
+        scores = np.asarray(scores, dtype=np.float64)
+        spread = scores.max() - scores.min()
+        if spread == 0:
+            return np.ones_like(scores)
+        return (scores - scores.min()) / spread
@@ -0,0 +1,132 @@
+"""
+Section Cache - Persistent Reuse of Extracted PDF Sections
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+def _umask_file_mode() -> int:
+    """Permissions open() would give a new file under the process umask"""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+# mkstemp files are private (0600); entries get the mode open() would give them
+FILE_MODE = _umask_file_mode()
+
+class SectionCache:
+    """On-disk cache of extract_document_content output
+    
+    Entries are keyed by the SHA-256 of the PDF bytes combined with the
+    PDFProcessor configuration fingerprint, so a changed document or a
+    changed extraction setup never reuses stale sections.
+    """
+    
+    def __init__(self, cache_dir: str, max_bytes: int = 512 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def hash_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+        """SHA-256 of a file's bytes, read in chunks"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def make_key(self, pdf_path: str, config_fingerprint: str) -> str:
+        """Cache key for a PDF under a given processor configuration"""
+        content_hash = self.hash_file(pdf_path)
+        return hashlib.sha256(f"{content_hash}:{config_fingerprint}".encode('utf-8')).hexdigest()
+    
+    def entry_path(self, key: str) -> Path:
+        """Location of the cache entry for a key"""
+        return self.cache_dir / f"{key}.json"
+    
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Return cached sections for key, or None on a miss"""
+        path = self.entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                sections = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        
+        # Touch the entry so eviction treats it as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        
+        self.hits += 1
+        return sections
+    
+    def put(self, key: str, sections: List[Dict[str, Any]]) -> bool:
+        """Store sections for key; safe with concurrent writers"""
+        tmp_path = None
+        try:
+            # Write to a private temp file, then atomically rename into place
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            os.fchmod(fd, FILE_MODE)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(sections, f, ensure_ascii=False)
+            os.replace(tmp_path, self.entry_path(key))
+        except (OSError, TypeError, ValueError) as e:
+            print(f"⚠️ Section cache write failed: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return False
+        
+        self.writes += 1
+        self._evict_to_size_limit()
+        return True
+    
+    def _evict_to_size_limit(self):
+        """Delete least recently used entries until the cache fits max_bytes"""
+        entries = []
+        total_bytes = 0
+        
+        for path in self.cache_dir.glob('*.json'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue  # Removed by another process
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_bytes += stat.st_size
+        
+        if total_bytes <= self.max_bytes:
+            return
+        
+        entries.sort()
+        for _, size, path in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                self.evictions += 1
+            except FileNotFoundError:
+                pass
+            total_bytes -= size
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for the run summary"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'writes': self.writes,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
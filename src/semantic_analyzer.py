@@ -3,16 +3,33 @@ Enhanced Semantic Analyzer - No Heavy Dependencies
 """
 
 import re
+import threading
 import numpy as np
 from typing import List, Dict, Any, Tuple
-from collections import Counter
+from collections import Counter, OrderedDict
+from keyword_matcher import KeywordMatcher
+from bm25_index import BM25Index
+from embedding_store import EmbeddingStore
+import instrumentation
 
 class SemanticAnalyzer:
-    def __init__(self, nlp_model, embedding_model, domain_vocabularies):
+    def __init__(self, nlp_model, embedding_model, domain_vocabularies, embedding_store_dir: str = None,
+                 embedding_store_max_bytes: int = None):
         self.nlp = nlp_model
         self.embedding_model = embedding_model
         self.domain_vocabularies = domain_vocabularies
         
+        # Opened on first use, once the embedder's name and dimension are known
+        self.embedding_store_dir = embedding_store_dir
+        self.embedding_store_max_bytes = embedding_store_max_bytes
+        self._embedding_store = None
+        self._embedding_store_lock = threading.Lock()
+        
+        # Query embeddings of recent persona/job pairs, so repeated queries skip the embedder
+        self.query_cache_size = 256
+        self._query_embeddings = OrderedDict()
+        self._query_embeddings_lock = threading.Lock()
+        
         # Job-specific patterns for exact matching
         self.job_patterns = {
             "4_days": ["4 days", "4-day", "four days", "four day", "multi-day"],
@@ -20,6 +37,16 @@ class SemanticAnalyzer:
             "group_10": ["group of 10", "10 people", "10 friends", "large group", "group travel"],
             "trip_planning": ["trip planning", "travel planning", "itinerary", "schedule", "organize"]
         }
+        
+        # Indicators of actionable and practical planning content
+        self.actionable_indicators = [
+            'how to', 'steps', 'guide', 'tips', 'plan', 'book', 'visit',
+            'organize', 'coordinate', 'arrange', 'prepare', 'reserve'
+        ]
+        self.practical_indicators = [
+            'address', 'location', 'cost', 'price', 'hours', 'contact',
+            'website', 'phone', 'directions', 'transport', 'metro', 'bus'
+        ]
     
     def analyze_persona_requirements(self, persona: str, job_description: str) -> Dict[str, Any]:
         """Analyze persona and job with focus on exact requirements"""
@@ -28,15 +55,29 @@ class SemanticAnalyzer:
         keywords = self._get_optimized_keywords(persona, job_description)
         patterns = self._create_exact_patterns(job_description)
         
-        context = f"{persona} planning {job_description}"
-        context_embedding = self.embedding_model.encode(context)
+        # Section content is compared against this query's persona and job
+        query_embedding = self.query_embedding(persona, job_description)
+        
+        # Every keyword factor reads from one matcher compiled per persona/job
+        keyword_matcher = KeywordMatcher({
+            'duration': [job_analysis['duration']] if job_analysis['duration'] else [],
+            'group_size': [str(job_analysis['group_size'])] if job_analysis['group_size'] else [],
+            'group_type': [job_analysis['group_type']] if job_analysis['group_type'] else [],
+            'patterns': patterns,
+            'critical': keywords['critical'],
+            'actionable': self.actionable_indicators,
+            'practical': self.practical_indicators
+        })
         
         return {
             'persona': persona,
             'job_analysis': job_analysis,
             'keywords': keywords,
             'patterns': patterns,
-            'context_embedding': context_embedding,
+            'keyword_matcher': keyword_matcher,
+            'query_embedding': query_embedding,
+            'query_norm': np.linalg.norm(query_embedding),
+            'bm25_query': " ".join([job_description] + keywords['critical'] + patterns),
             'scoring_weights': self._get_scoring_weights()
         }
     
@@ -119,97 +160,227 @@ class SemanticAnalyzer:
             'practical_value': 1.5
         }
     
+    @staticmethod
+    def query_text(persona: str, job_description: str) -> str:
+        """Text that section content is compared against for one query"""
+        return f"{persona}: {job_description}"
+    
+    def query_embedding(self, persona: str, job_description: str) -> np.ndarray:
+        """Embedding of a persona/job pair, computed once while it stays recent"""
+        key = (persona, job_description)
+        with self._query_embeddings_lock:
+            embedding = self._query_embeddings.get(key)
+            if embedding is not None:
+                self._query_embeddings.move_to_end(key)
+                return embedding
+        
+        embedding = self.embedding_model.encode(self.query_text(persona, job_description))
+        with self._query_embeddings_lock:
+            self._query_embeddings[key] = embedding
+            while len(self._query_embeddings) > self.query_cache_size:
+                self._query_embeddings.popitem(last=False)
+        return embedding
+    
+    def embed_sections(self, sections: List[Dict[str, Any]]) -> np.ndarray:
+        """Embed the content of every section in one batched call
+        
+        With an embedding store, only texts it does not hold yet are
+        embedded and appended. The result is then read from the store's
+        memory map, as a zero-copy view when the rows are consecutive, or
+        copied together with the vectors a full store did not take.
+        """
+        texts = [section.get('content', '')[:800] for section in sections]
+        with instrumentation.span("embed_sections"):
+            store = self.embedding_store()
+            if store is None:
+                return self.embedding_model.encode_batch(texts)
+            
+            keys = [EmbeddingStore.make_key(text) for text in texts]
+            rows = store.lookup(keys)
+            missing = np.flatnonzero(rows < 0)
+            if len(missing):
+                vectors = self.embedding_model.encode_batch([texts[i] for i in missing])
+                stored_rows = store.append([keys[i] for i in missing], vectors)
+                rows[missing] = stored_rows
+            instrumentation.count('embeddings_from_store', len(texts) - len(missing))
+            
+            unstored = rows < 0
+            if unstored.any():
+                embeddings = np.empty((len(texts), store.dimension), dtype=np.float32)
+                embeddings[~unstored] = store.view(rows[~unstored])
+                embeddings[missing] = vectors
+                return embeddings
+            return store.view(rows)
+    
+    def embedding_store(self):
+        """The section embedding store for the current embedder, or None"""
+        if self.embedding_store_dir and self._embedding_store is None:
+            with self._embedding_store_lock:
+                if self._embedding_store is None:
+                    self._embedding_store = EmbeddingStore(
+                        self.embedding_store_dir, self.embedding_model.name, self.embedding_model.dimension,
+                        max_bytes=self.embedding_store_max_bytes
+                    )
+        return self._embedding_store
+    
+    def build_bm25_index(self, sections: List[Dict[str, Any]]) -> BM25Index:
+        """Index the title and content of every section for BM25 retrieval"""
+        return BM25Index([f"{section.get('title', '')} {section.get('content', '')}" for section in sections])
+    
+    def calculate_bm25_scores(self, bm25_index: BM25Index, requirements: Dict[str, Any]) -> np.ndarray:
+        """BM25 scores for the job query, scaled to [0, 1] by the best match"""
+        scores = bm25_index.score(requirements['bm25_query'])
+        best = scores.max() if len(scores) else 0.0
+        return scores / best if best > 0 else scores
+    
     def calculate_enhanced_relevance(self, section: Dict[str, Any], 
-                                   requirements: Dict[str, Any]) -> Dict[str, float]:
-        """Calculate relevance scores"""
+                                   requirements: Dict[str, Any],
+                                   section_embedding: np.ndarray = None) -> Dict[str, float]:
+        """Calculate relevance scores
+        
+        section_embedding may carry the section's row from embed_sections;
+        without it the content is embedded on the spot.
+        """
+        scores = self._calculate_lexical_relevance(section, requirements)
+        
+        scores['semantic_similarity'] = self._calculate_semantic_similarity(
+            section, requirements['query_embedding'], requirements['query_norm'], section_embedding
+        )
+        
+        return scores
+    
+    def calculate_relevance_matrix(self, sections: List[Dict[str, Any]], requirements: Dict[str, Any],
+                                   factor_names: List[str], section_embeddings: np.ndarray) -> np.ndarray:
+        """Relevance scores for all sections as an (N, len(factor_names)) matrix
+        
+        Semantic similarity is computed for every section at once; the
+        keyword factors are filled in per section. BM25 relevance is copied
+        from requirements['bm25_scores'] when present, one entry per section.
+        """
+        matrix = np.zeros((len(sections), len(factor_names)))
+        columns = {name: j for j, name in enumerate(factor_names)}
+        
+        with instrumentation.span("lexical_factors"):
+            for i, section in enumerate(sections):
+                for name, score in self._calculate_lexical_relevance(section, requirements).items():
+                    if name in columns:
+                        matrix[i, columns[name]] = score
+        
+        if 'semantic_similarity' in columns:
+            with instrumentation.span("semantic_similarity"):
+                matrix[:, columns['semantic_similarity']] = self.calculate_semantic_similarities(
+                    sections, requirements, section_embeddings
+                )
+        
+        # BM25 needs collection statistics, so it comes precomputed per section
+        if 'bm25_relevance' in columns and 'bm25_scores' in requirements:
+            matrix[:, columns['bm25_relevance']] = requirements['bm25_scores']
+        
+        return matrix
+    
+    def calculate_semantic_similarities(self, sections: List[Dict[str, Any]], requirements: Dict[str, Any],
+                                        section_embeddings: np.ndarray) -> np.ndarray:
+        """Cosine similarity of every section embedding to the query vector
+        
+        One matrix-vector product scores all (N, d) embeddings, divided by
+        their norms afterwards, so a memory-mapped matrix is read in place
+        rather than copied into a normalized one.
+        """
+        embeddings = np.asarray(section_embeddings, dtype=np.float32)
+        similarities = np.zeros(len(embeddings), dtype=np.float32)
+        
+        query_norm = requirements['query_norm']
+        if len(embeddings) == 0 or query_norm == 0:
+            return similarities
+        
+        query = np.asarray(requirements['query_embedding'], dtype=np.float32) / np.float32(query_norm)
+        
+        norms = np.sqrt(np.einsum('ij,ij->i', embeddings, embeddings))
+        valid = norms > 0
+        # Sections without content score zero, as in the per-section path
+        valid &= np.array([bool(section.get('content', '')) for section in sections])
+        
+        similarities[valid] = (embeddings @ query)[valid] / norms[valid]
+        
+        return similarities
+    
+    def _calculate_lexical_relevance(self, section: Dict[str, Any], 
+                                     requirements: Dict[str, Any]) -> Dict[str, float]:
+        """Calculate the keyword and quality based relevance scores"""
         
         content = section.get('content', '')
         title = section.get('title', '')
         combined_text = f"{title} {content}".lower()
         
+        # One matcher pass feeds every keyword factor
+        matches = requirements['keyword_matcher'].count(combined_text)
+        
         scores = {}
         
-        scores['exact_job_match'] = self._score_exact_job_match(
-            combined_text, requirements['job_analysis'], requirements['patterns']
-        )
+        scores['exact_job_match'] = self._score_exact_job_match(matches)
         
         scores['critical_keywords'] = self._score_critical_keywords(
-            combined_text, requirements['keywords']['critical']
+            matches, requirements['keywords']['critical']
         )
         
-        scores['semantic_similarity'] = self._calculate_semantic_similarity(
-            section, requirements['context_embedding']
-        )
-        
-        scores['actionable_content'] = self._score_actionable_content(
-            combined_text, requirements['keywords']['actionable']
-        )
+        scores['actionable_content'] = self._score_actionable_content(matches)
         
         scores['section_quality'] = section.get('quality_score', 0.5)
         
-        scores['practical_value'] = self._score_practical_value(combined_text)
+        scores['practical_value'] = self._score_practical_value(combined_text, matches)
         
         return scores
     
-    def _score_exact_job_match(self, text: str, job_analysis: Dict, patterns: List[str]) -> float:
+    def _score_exact_job_match(self, matches: Dict[str, int]) -> float:
         """Score exact match to job requirements"""
         score = 0.0
         
-        if job_analysis['duration'] and job_analysis['duration'].lower() in text:
+        if matches['duration']:
             score += 0.4
         
-        if job_analysis['group_size'] and str(job_analysis['group_size']) in text:
+        if matches['group_size']:
             score += 0.3
         
-        if job_analysis['group_type'] and job_analysis['group_type'].lower() in text:
+        if matches['group_type']:
             score += 0.2
         
-        pattern_matches = sum(1 for pattern in patterns if pattern.lower() in text)
-        score += min(pattern_matches * 0.1, 0.3)
+        score += min(matches['patterns'] * 0.1, 0.3)
         
         return min(score, 1.0)
     
-    def _score_critical_keywords(self, text: str, critical_keywords: List[str]) -> float:
+    def _score_critical_keywords(self, matches: Dict[str, int], critical_keywords: List[str]) -> float:
         """Score critical keyword presence"""
         if not critical_keywords:
             return 0.0
         
-        matches = sum(1 for keyword in critical_keywords if keyword.lower() in text)
-        return matches / len(critical_keywords)
+        return matches['critical'] / len(critical_keywords)
     
-    def _calculate_semantic_similarity(self, section: Dict[str, Any], context_embedding) -> float:
-        """Calculate semantic similarity using lightweight embedder"""
+    def _calculate_semantic_similarity(self, section: Dict[str, Any], query_embedding: np.ndarray,
+                                       query_norm: float, section_embedding: np.ndarray = None) -> float:
+        """Calculate semantic similarity to the precomputed query vector"""
         content = section.get('content', '')
         if not content:
             return 0.0
         
         try:
-            return self.embedding_model.similarity(
-                content[:800], 
-                "travel planning for college friends 4 days group activities"
-            )
+            if section_embedding is None:
+                section_embedding = self.embedding_model.encode(content[:800])
+            
+            section_norm = np.linalg.norm(section_embedding)
+            if section_norm == 0 or query_norm == 0:
+                return 0.0
+            
+            return float(np.dot(section_embedding, query_embedding) / (section_norm * query_norm))
         except:
             return 0.0
     
-    def _score_actionable_content(self, text: str, actionable_keywords: List[str]) -> float:
+    def _score_actionable_content(self, matches: Dict[str, int]) -> float:
         """Score actionable content"""
-        actionable_indicators = [
-            'how to', 'steps', 'guide', 'tips', 'plan', 'book', 'visit',
-            'organize', 'coordinate', 'arrange', 'prepare', 'reserve'
-        ]
-        
-        matches = sum(1 for indicator in actionable_indicators if indicator in text)
-        return min(matches * 0.15, 1.0)
+        return min(matches['actionable'] * 0.15, 1.0)
     
-    def _score_practical_value(self, text: str) -> float:
+    def _score_practical_value(self, text: str, matches: Dict[str, int]) -> float:
         """Score practical planning value"""
-        practical_indicators = [
-            'address', 'location', 'cost', 'price', 'hours', 'contact',
-            'website', 'phone', 'directions', 'transport', 'metro', 'bus'
-        ]
-        
-        matches = sum(1 for indicator in practical_indicators if indicator in text)
-        practical_score = min(matches * 0.1, 0.6)
+        practical_score = min(matches['practical'] * 0.1, 0.6)
         
         if text.count(':') > 2 or text.count(';') > 2:
             practical_score += 0.2
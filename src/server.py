@@ -0,0 +1,389 @@
+"""
+Pipeline Server - Warm Models Behind a Local HTTP/JSON Endpoint
+"""
+
+import os
+import json
+import time
+import asyncio
+import threading
+import traceback
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from http import HTTPStatus
+from pathlib import Path
+from typing import List, Dict, Any, Tuple
+
+import instrumentation
+from batch_runner import answer_query
+from main import build_pipeline
+from pdf_processor import available_cpu_count
+
+class RequestError(ValueError):
+    """A request the client has to fix, with the HTTP status to answer"""
+    
+    def __init__(self, message: str, status: HTTPStatus = HTTPStatus.BAD_REQUEST):
+        super().__init__(message)
+        self.status = status
+
+class PipelineService:
+    """Answers persona/job queries with models and corpora kept warm between requests
+    
+    Extracted sections and their corpus features (BM25 index and section
+    embeddings) are kept for the most recent document sets, keyed on each
+    file's path, size and mtime, so repeating a document set costs only
+    the query scoring. Concurrent requests for a document set that is
+    still being prepared wait for that one preparation. Documents are
+    extracted in the request's worker thread, or on extraction_pool, a
+    pool from PDFProcessor.create_extraction_pool shared by all requests.
+    """
+    
+    def __init__(self, pipeline: Dict[str, Any], pdf_dir: str, max_corpora: int = 16,
+                 extraction_pool=None):
+        self.pipeline = pipeline
+        self.pdf_dir = Path(pdf_dir).resolve()
+        self.max_corpora = max(1, max_corpora)
+        self.extraction_pool = extraction_pool
+        
+        self._lock = threading.Lock()
+        self._corpora = OrderedDict()
+        self.requests_served = 0
+        self.corpus_hits = 0
+        self.corpus_misses = 0
+    
+    def warm_up(self):
+        """Load every model a request can need, ahead of the first request"""
+        semantic_analyzer = self.pipeline['semantic_analyzer']
+        semantic_analyzer.nlp.resolve()
+        semantic_analyzer.embedding_model.resolve()
+        semantic_analyzer.domain_vocabularies.resolve()
+        if self.pipeline['reranker'] is not None:
+            self.pipeline['reranker'].warm()
+        
+        # Start every extraction worker now rather than on the first request
+        if self.extraction_pool is not None:
+            workers = self.pipeline['max_workers']
+            for future in [self.extraction_pool.submit(os.getpid) for _ in range(workers)]:
+                future.result()
+    
+    def parse_query(self, payload: Any) -> Dict[str, Any]:
+        """Normalise a request body to the challenge_config.json shape
+        
+        Accepts a challenge_config.json document as is, or the shorthand
+        {"persona": "...", "job": "...", "documents": ["a.pdf", ...]}.
+        """
+        if not isinstance(payload, dict):
+            raise RequestError("Request body must be a JSON object")
+        
+        persona = payload.get('persona')
+        if isinstance(persona, dict):
+            persona = persona.get('role')
+        job = payload.get('job', payload.get('job_to_be_done'))
+        if isinstance(job, dict):
+            job = job.get('task')
+        documents = payload.get('documents')
+        
+        if not isinstance(persona, str) or not persona.strip():
+            raise RequestError("Missing persona")
+        if not isinstance(job, str) or not job.strip():
+            raise RequestError("Missing job")
+        if not isinstance(documents, list) or not documents:
+            raise RequestError("Missing documents")
+        
+        document_infos = []
+        for document in documents:
+            doc_info = document if isinstance(document, dict) else {'filename': document}
+            if not isinstance(doc_info.get('filename'), str):
+                raise RequestError("Each document needs a filename")
+            document_infos.append(doc_info)
+        
+        return {
+            'challenge_info': payload.get('challenge_info', {}),
+            'documents': document_infos,
+            'persona': {'role': persona},
+            'job_to_be_done': {'task': job}
+        }
+    
+    def resolve_documents(self, query: Dict[str, Any]) -> List[Path]:
+        """PDF paths of a query's documents, confined to the PDF folder"""
+        pdf_paths = []
+        for doc_info in query['documents']:
+            pdf_path = (self.pdf_dir / doc_info['filename']).resolve()
+            if self.pdf_dir not in pdf_path.parents:
+                raise RequestError(f"Document outside the PDF folder: {doc_info['filename']}")
+            if not pdf_path.is_file():
+                raise RequestError(f"Document not found: {doc_info['filename']}", HTTPStatus.NOT_FOUND)
+            pdf_paths.append(pdf_path)
+        return pdf_paths
+    
+    def corpus_features(self, pdf_paths: List[Path]) -> Dict[str, Any]:
+        """Corpus features of a document set, prepared once while it stays recent"""
+        key = tuple((str(path), path.stat().st_size, path.stat().st_mtime_ns) for path in pdf_paths)
+        
+        with self._lock:
+            entry = self._corpora.get(key)
+            owner = entry is None
+            if owner:
+                entry = self._corpora[key] = Future()
+                self.corpus_misses += 1
+                while len(self._corpora) > self.max_corpora:
+                    self._corpora.popitem(last=False)
+            else:
+                self._corpora.move_to_end(key)
+                self.corpus_hits += 1
+        
+        if owner:
+            try:
+                entry.set_result(self._prepare_corpus(pdf_paths))
+            except Exception as e:
+                # Failed preparations are not cached; the next request retries
+                entry.set_exception(e)
+                with self._lock:
+                    if self._corpora.get(key) is entry:
+                        del self._corpora[key]
+        
+        return entry.result()
+    
+    def _prepare_corpus(self, pdf_paths: List[Path]) -> Dict[str, Any]:
+        with instrumentation.span("extract"):
+            # Never fork a pool from this threaded process; see create_extraction_pool
+            document_sections = self.pipeline['pdf_processor'].extract_documents(
+                [str(path) for path in pdf_paths], max_workers=1,
+                cache=self.pipeline['section_cache'], executor=self.extraction_pool
+            )
+        sections = [section for doc_sections in document_sections for section in doc_sections]
+        return self.pipeline['relevance_scorer'].build_corpus_features(sections)
+    
+    def handle(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer one parsed query; safe to call from several threads"""
+        features = self.corpus_features(self.resolve_documents(query))
+        final_output = answer_query(
+            query, features, self.pipeline['relevance_scorer'],
+            self.pipeline['subsection_extractor'], self.pipeline['output_formatter'],
+            reranker=self.pipeline['reranker'], candidate_count=self.pipeline['candidate_count']
+        )
+        
+        with self._lock:
+            self.requests_served += 1
+        return final_output
+    
+    def stats(self) -> Dict[str, Any]:
+        """Counters for the health endpoint"""
+        with self._lock:
+            return {
+                'requests_served': self.requests_served,
+                'corpora_cached': len(self._corpora),
+                'corpus_hits': self.corpus_hits,
+                'corpus_misses': self.corpus_misses,
+                'models': self.pipeline['model_loader'].get_model_stats()
+            }
+
+class PipelineServer:
+    """asyncio HTTP front end feeding a bounded queue drained by a thread pool
+    
+    Up to workers requests run at once and up to queue_size more wait;
+    anything beyond that is refused at once with 503 and Retry-After
+    rather than queued without limit. The blocking pipeline runs in
+    worker threads so the event loop keeps accepting connections.
+    
+    Endpoints: POST /analyze with a query body returns the results.json
+    structure; GET /health reports queue depth and service counters.
+    """
+    
+    def __init__(self, service: PipelineService, host: str = "127.0.0.1", port: int = 8080,
+                 workers: int = 1, queue_size: int = 16, max_body_bytes: int = 1024 * 1024):
+        self.service = service
+        self.host = host
+        self.port = port
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.max_body_bytes = max_body_bytes
+        
+        self._queue = None
+        self._executor = None
+    
+    async def serve(self):
+        """Accept requests until cancelled"""
+        self._queue = asyncio.Queue(self.queue_size)
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="pipeline")
+        consumers = [asyncio.create_task(self._consume()) for _ in range(self.workers)]
+        
+        server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        print(f"🌐 Serving on http://{self.host}:{self.port} "
+              f"({self.workers} workers, queue of {self.queue_size})")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for consumer in consumers:
+                consumer.cancel()
+            self._executor.shutdown(wait=False, cancel_futures=True)
+    
+    async def _consume(self):
+        """Run queued queries on the thread pool, one at a time per consumer"""
+        loop = asyncio.get_running_loop()
+        while True:
+            query, result = await self._queue.get()
+            try:
+                if not result.done():
+                    output = await loop.run_in_executor(self._executor, self.service.handle, query)
+                    if not result.done():
+                        result.set_result(output)
+            except Exception as e:
+                if not result.done():
+                    result.set_exception(e)
+            finally:
+                self._queue.task_done()
+    
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        start_time = time.perf_counter()
+        try:
+            method, path, (status, body, headers) = await self._respond(reader)
+            
+            elapsed_ms = (time.perf_counter() - start_time) * 1000
+            headers['X-Processing-Ms'] = f"{elapsed_ms:.1f}"
+            await self._write_response(writer, status, body, headers)
+            print(f"🌐 {method} {path} -> {status.value} ({elapsed_ms:.0f}ms)")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            # Every path releases the socket, including clients that hang up early
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+    
+    async def _respond(self, reader: asyncio.StreamReader) -> Tuple[str, str, Tuple[HTTPStatus, Any, Dict[str, str]]]:
+        """Read one request and produce (method, path, (status, body, headers))"""
+        # readline raises ValueError for a line over the stream limit (64 KB)
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+        except ValueError:
+            return '-', '-', self._error(HTTPStatus.REQUEST_URI_TOO_LONG, "Request line too long")
+        if len(request_line) != 3:
+            return '-', '-', self._error(HTTPStatus.BAD_REQUEST, "Malformed request line")
+        method, target, _ = request_line
+        path = target.split('?', 1)[0]
+        
+        headers = {}
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError:
+                return method, path, self._error(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Header line too long")
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        
+        if path == '/health':
+            if method != 'GET':
+                return method, path, self._error(HTTPStatus.METHOD_NOT_ALLOWED, "Use GET")
+            return method, path, (HTTPStatus.OK, self.health(), {})
+        if path != '/analyze':
+            return method, path, self._error(HTTPStatus.NOT_FOUND, f"No endpoint at {path}")
+        if method != 'POST':
+            return method, path, self._error(HTTPStatus.METHOD_NOT_ALLOWED, "Use POST")
+        
+        try:
+            content_length = int(headers.get('content-length', '0'))
+            if content_length < 0:
+                raise ValueError(content_length)
+        except ValueError:
+            return method, path, self._error(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if content_length > self.max_body_bytes:
+            return method, path, self._error(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+        
+        try:
+            query = self.service.parse_query(json.loads(await reader.readexactly(content_length)))
+        except RequestError as e:
+            return method, path, self._error(e.status, str(e))
+        except ValueError as e:
+            return method, path, self._error(HTTPStatus.BAD_REQUEST, f"Invalid JSON: {e}")
+        
+        # Backpressure: refuse rather than queue past the limit
+        result = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((query, result))
+        except asyncio.QueueFull:
+            status, body, headers = self._error(HTTPStatus.SERVICE_UNAVAILABLE, "Server busy, retry later")
+            headers['Retry-After'] = '1'
+            return method, path, (status, body, headers)
+        
+        try:
+            return method, path, (HTTPStatus.OK, await result, {})
+        except RequestError as e:
+            return method, path, self._error(e.status, str(e))
+        except Exception as e:
+            traceback.print_exc()
+            return method, path, self._error(HTTPStatus.INTERNAL_SERVER_ERROR, str(e))
+    
+    @staticmethod
+    def _error(status: HTTPStatus, message: str) -> Tuple[HTTPStatus, Dict[str, str], Dict[str, str]]:
+        return status, {'error': message}, {}
+    
+    @staticmethod
+    async def _write_response(writer: asyncio.StreamWriter, status: HTTPStatus, body: Any,
+                              headers: Dict[str, str]):
+        payload = json.dumps(body, indent=4, ensure_ascii=False).encode('utf-8')
+        head = [
+            f"HTTP/1.1 {status.value} {status.phrase}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(payload)}",
+            "Connection: close"
+        ] + [f"{name}: {value}" for name, value in headers.items()]
+        
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode('latin-1') + payload)
+        await writer.drain()
+    
+    def health(self) -> Dict[str, Any]:
+        """Queue depth and service counters"""
+        return {
+            'status': 'ok',
+            'workers': self.workers,
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'queue_size': self.queue_size,
+            **self.service.stats()
+        }
+
+def main():
+    """Load the models once, then serve queries until interrupted"""
+    print("🚀 Starting Challenge 1B - Pipeline Server")
+    print("="*60)
+    
+    pipeline = build_pipeline()
+    
+    # One extraction pool for the server's lifetime; PDF_WORKERS=1 extracts in the request thread
+    extraction_pool = None
+    if pipeline['max_workers'] > 1:
+        extraction_pool = pipeline['pdf_processor'].create_extraction_pool(pipeline['max_workers'])
+    
+    service = PipelineService(
+        pipeline,
+        os.environ.get("SERVER_PDF_DIR", "/app/input/pdf"),
+        max_corpora=int(os.environ.get("SERVER_MAX_CORPORA", "16")),
+        extraction_pool=extraction_pool
+    )
+    
+    print("🔥 Warming up models...")
+    service.warm_up()
+    pipeline['model_loader'].print_model_report()
+    
+    server = PipelineServer(
+        service,
+        host=os.environ.get("SERVER_HOST", "127.0.0.1"),
+        port=int(os.environ.get("SERVER_PORT", "8080")),
+        workers=int(os.environ.get("SERVER_WORKERS", "0")) or available_cpu_count(),
+        queue_size=int(os.environ.get("SERVER_QUEUE_SIZE", "16"))
+    )
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        print("\n👋 Server stopped")
+    finally:
+        if extraction_pool is not None:
+            extraction_pool.shutdown(cancel_futures=True)
+
+if __name__ == "__main__":
+    main()
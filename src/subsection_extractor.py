@@ -5,6 +5,8 @@ Enhanced Subsection Extractor - Optimized for Target Output Quality
 import re
 import numpy as np
 from typing import List, Dict, Any, Tuple
+from keyword_matcher import KeywordMatcher
+import instrumentation
 
 class SubsectionExtractor:
     def __init__(self, semantic_analyzer):
@@ -21,6 +23,12 @@ class SubsectionExtractor:
             "introduction", "overview", "welcome", "about this", "general",
             "in general", "typically", "usually", "known for"
         ]
+        
+        # Sentence-level bonus terms
+        self.actionable_terms = ['plan', 'visit', 'book', 'organize', 'coordinate', 'arrange']
+        self.practical_terms = ['cost', 'price', 'address', 'hours', 'phone', 'website']
+        
+        self.avoid_matcher = KeywordMatcher({'avoid': self.avoid_terms})
     
     def extract_refined_subsections(self, top_sections: List[Dict[str, Any]], 
                                    persona: str, job_description: str) -> List[Dict[str, Any]]:
@@ -28,9 +36,14 @@ class SubsectionExtractor:
         
         print(f"📝 Extracting refined subsections for target accuracy...")
         
-        requirements = self.semantic_analyzer.analyze_persona_requirements(
-            persona, job_description
-        )
+        if not top_sections:
+            return []
+        
+        with instrumentation.span("requirements_analysis"):
+            requirements = self.semantic_analyzer.analyze_persona_requirements(
+                persona, job_description
+            )
+            requirements['sentence_matcher'] = self._build_sentence_matcher(requirements)
         
         refined_subsections = []
         
@@ -58,6 +71,7 @@ class SubsectionExtractor:
                         'page_number': section['page_number']
                     })
         
+        instrumentation.count('subsections_extracted', len(refined_subsections))
         print(f"✅ Generated {len(refined_subsections)} refined subsections")
         return refined_subsections
     
@@ -79,6 +93,7 @@ class SubsectionExtractor:
                 continue
             
             score = self._score_sentence_for_target(sentence, requirements)
+            instrumentation.count('sentences_scored')
             if score > 0.4:  # Higher threshold for quality
                 sentence_scores.append((sentence, score))
         
@@ -110,9 +125,8 @@ class SubsectionExtractor:
         sentence_lower = sentence.lower()
         
         # Avoid generic content
-        for term in self.avoid_terms:
-            if term in sentence_lower:
-                return True
+        if self.avoid_matcher.contains_any(sentence_lower, 'avoid'):
+            return True
         
         # Avoid very short or very long sentences
         if len(sentence.split()) < 8 or len(sentence.split()) > 50:
@@ -127,35 +141,27 @@ class SubsectionExtractor:
     def _score_sentence_for_target(self, sentence: str, requirements: Dict[str, Any]) -> float:
         """Score sentence for target output quality"""
         
-        sentence_lower = sentence.lower()
+        matches = requirements['sentence_matcher'].count(sentence.lower())
         score = 0.0
         
         # Job correlation (highest weight)
-        job_analysis = requirements['job_analysis']
-        
-        if job_analysis['duration'] and job_analysis['duration'].lower() in sentence_lower:
+        if matches['duration']:
             score += 0.6
         
-        if job_analysis['group_size'] and str(job_analysis['group_size']) in sentence_lower:
+        if matches['group_size']:
             score += 0.5
         
-        if job_analysis['group_type'] and job_analysis['group_type'].lower() in sentence_lower:
+        if matches['group_type']:
             score += 0.4
         
         # Keyword correlation
-        keyword_matches = sum(1 for term in self.job_correlation_terms 
-                            if term.lower() in sentence_lower)
-        score += min(keyword_matches * 0.15, 0.6)
+        score += min(matches['correlation'] * 0.15, 0.6)
         
         # Actionable content bonus
-        actionable_terms = ['plan', 'visit', 'book', 'organize', 'coordinate', 'arrange']
-        actionable_matches = sum(1 for term in actionable_terms if term in sentence_lower)
-        score += min(actionable_matches * 0.1, 0.3)
+        score += min(matches['actionable'] * 0.1, 0.3)
         
         # Practical information bonus
-        practical_terms = ['cost', 'price', 'address', 'hours', 'phone', 'website']
-        practical_matches = sum(1 for term in practical_terms if term in sentence_lower)
-        score += min(practical_matches * 0.1, 0.2)
+        score += min(matches['practical'] * 0.1, 0.2)
         
         # Specific details bonus (numbers, times, names)
         if re.search(r'\b\d+\b', sentence):
@@ -163,6 +169,19 @@ class SubsectionExtractor:
         
         return min(score, 1.0)
     
+    def _build_sentence_matcher(self, requirements: Dict[str, Any]) -> KeywordMatcher:
+        """Compile the sentence scoring keyword sets for one job"""
+        job_analysis = requirements['job_analysis']
+        
+        return KeywordMatcher({
+            'duration': [job_analysis['duration']] if job_analysis['duration'] else [],
+            'group_size': [str(job_analysis['group_size'])] if job_analysis['group_size'] else [],
+            'group_type': [job_analysis['group_type']] if job_analysis['group_type'] else [],
+            'correlation': self.job_correlation_terms,
+            'actionable': self.actionable_terms,
+            'practical': self.practical_terms
+        })
+    
     def _combine_high_quality_sentences(self, sentence_scores: List[Tuple[str, float]], 
                                       max_words: int = 250) -> str:
         """Combine high-quality sentences into coherent text"""
@@ -205,7 +224,7 @@ class SubsectionExtractor:
         for paragraph in paragraphs[:3]:
             paragraph = paragraph.strip()
             if (len(paragraph.split()) > 20 and 
-                not any(term in paragraph.lower() for term in self.avoid_terms)):
+                not self.avoid_matcher.contains_any(paragraph.lower(), 'avoid')):
                 
                 # Truncate to reasonable length
                 words = paragraph.split()
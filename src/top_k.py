@@ -0,0 +1,25 @@
+"""
+Top-K - Partial-Partition Selection of the Best Scores
+"""
+
+import numpy as np
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first; ties go to the lower index
+    
+    Uses a partial partition instead of a full sort, so the cost is linear
+    in len(scores) plus a sort of the k survivors.
+    """
+    scores = np.asarray(scores)
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    
+    if k < len(scores):
+        kth_largest = np.partition(scores, len(scores) - k)[len(scores) - k]
+        candidates = np.flatnonzero(scores >= kth_largest)
+    else:
+        candidates = np.arange(len(scores))
+    
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order][:k]